@@ -9,11 +9,16 @@ import random
 import atproto
 import contextlib
 import gzip
+import sqlite3
+import collections.abc
 import sys
 import typer
 from rich.markup import escape
+from atproto import exceptions
 
+# The old state file, only read to migrate it to the database
 STATE_FILENAME = pathlib.Path.home() / ".bsky-state.json.gz"
+DATABASE_FILENAME = pathlib.Path.home() / ".bsky-state.sqlite3"
 
 console = rich.console.Console()
 app = typer.Typer()
@@ -21,14 +26,23 @@ app = typer.Typer()
 # HALF_LIFE = 365.25 / 3.0
 # THRESHOLD = 0.003
 
+# The PDS's limits on writes to a repo, where creating a record costs 3 points
+# https://docs.bsky.app/docs/advanced-guides/rate-limits
+DAILY_WRITE_POINTS = 35_000
+HOURLY_WRITE_POINTS = 5_000
+CREATE_POINTS = 3
+
 
 def daystamp():
     """The unix timestamp but in 'days' instead of seconds."""
     return time.time() / (60 * 60 * 24)
 
 
-class State(pydantic.BaseModel):
-    """Need to keep some state but don't need a database"""
+class GzipState(pydantic.BaseModel):
+    """The state as it used to be kept, in a gzipped JSON file
+
+    Only used to migrate it to the database.
+    """
 
     session: str = ""
     last_unblock_run_daystamp: float = pydantic.Field(default_factory=daystamp)
@@ -46,11 +60,196 @@ class State(pydantic.BaseModel):
         except FileNotFoundError:
             return cls()
 
-    def save(self):
+
+class BlockList(collections.abc.MutableMapping):
+    """rkey: did of every block record, kept in the state database"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __getitem__(self, rkey):
+        row = self.connection.execute(
+            "SELECT did FROM block_list WHERE rkey = ?", (rkey,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(rkey)
+        return row[0]
+
+    def __setitem__(self, rkey, did):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO block_list (rkey, did) VALUES (?, ?)", (rkey, did)
+        )
+
+    def __delitem__(self, rkey):
+        cursor = self.connection.execute(
+            "DELETE FROM block_list WHERE rkey = ?", (rkey,)
+        )
+        if cursor.rowcount == 0:
+            raise KeyError(rkey)
+
+    def __iter__(self):
+        rows = self.connection.execute("SELECT rkey FROM block_list").fetchall()
+        return (rkey for (rkey,) in rows)
+
+    def __len__(self):
+        return self.connection.execute("SELECT count(*) FROM block_list").fetchone()[0]
+
+    def items(self):
+        return self.connection.execute("SELECT rkey, did FROM block_list").fetchall()
+
+    def values(self):
+        return [did for (did,) in self.connection.execute("SELECT did FROM block_list")]
+
+
+class BlockQueue(collections.abc.MutableSet):
+    """dids waiting to be blocked, kept in the state database"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __contains__(self, did):
+        row = self.connection.execute(
+            "SELECT 1 FROM block_queue WHERE did = ?", (did,)
+        ).fetchone()
+        return row is not None
+
+    def __iter__(self):
+        rows = self.connection.execute("SELECT did FROM block_queue").fetchall()
+        return (did for (did,) in rows)
+
+    def __len__(self):
+        return self.connection.execute("SELECT count(*) FROM block_queue").fetchone()[0]
+
+    def add(self, did):
+        self.connection.execute(
+            "INSERT OR IGNORE INTO block_queue (did) VALUES (?)", (did,)
+        )
+
+    def discard(self, did):
+        self.connection.execute("DELETE FROM block_queue WHERE did = ?", (did,))
+
+
+class State:
+    """Need to keep some state, in an SQLite database
+
+    Changes are written to the database as they're made, and committed by
+    save(), so only what's changed is ever written and nothing has to be
+    read until it's used.
+    """
+
+    def __init__(self, path=DATABASE_FILENAME):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+                CREATE TABLE IF NOT EXISTS block_list
+                    (rkey TEXT PRIMARY KEY, did TEXT NOT NULL) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS block_list_did ON block_list (did);
+                CREATE TABLE IF NOT EXISTS block_queue
+                    (did TEXT PRIMARY KEY) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS writes
+                    (time REAL NOT NULL, points INTEGER NOT NULL);
+                """
+            )
+        self.app_bsky_graph_block_list = BlockList(self.connection)
+        self.block_queue = BlockQueue(self.connection)
+        if self._get("last_unblock_run_daystamp") is None:
+            self._create()
+
+    def _get(self, key):
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _set(self, key, value):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def _create(self):
+        """Set up a new database, from the old state file if there is one"""
+        old_state = GzipState.load()
         start = time.time()
-        pathlib.Path(STATE_FILENAME).write_bytes(
-            gzip.compress(self.model_dump_json(indent=1).encode("utf-8"))
+        self.session = old_state.session
+        self.last_unblock_run_daystamp = old_state.last_unblock_run_daystamp
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO block_list (rkey, did) VALUES (?, ?)",
+            old_state.app_bsky_graph_block_list.items(),
+        )
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO block_queue (did) VALUES (?)",
+            ((did,) for did in old_state.block_queue),
         )
+        self.connection.commit()
+        if STATE_FILENAME.exists():
+            # Keep the old file, but don't migrate it again
+            STATE_FILENAME.rename(f"{STATE_FILENAME}.migrated")
+            duration = time.time() - start
+            console.log(f"migrated {STATE_FILENAME} in {duration} seconds")
+
+    @property
+    def session(self) -> str:
+        return self._get("session") or ""
+
+    @session.setter
+    def session(self, value: str):
+        self._set("session", value)
+
+    @property
+    def last_unblock_run_daystamp(self) -> float:
+        return self._get("last_unblock_run_daystamp")
+
+    @last_unblock_run_daystamp.setter
+    def last_unblock_run_daystamp(self, value: float):
+        self._set("last_unblock_run_daystamp", value)
+
+    @property
+    def unconfirmed_block_batches(self) -> int:
+        """How many block batches were sent without knowing whether the
+        records were created, or which rkeys they got"""
+        return self._get("unconfirmed_block_batches") or 0
+
+    @unconfirmed_block_batches.setter
+    def unconfirmed_block_batches(self, value: int):
+        self._set("unconfirmed_block_batches", value)
+
+    @classmethod
+    def load(cls):
+        return cls()
+
+    def remove_blocked_from_queue(self) -> int:
+        """Remove every did that's already blocked from the block queue"""
+        cursor = self.connection.execute(
+            "DELETE FROM block_queue WHERE did IN (SELECT did FROM block_list)"
+        )
+        return cursor.rowcount
+
+    def record_writes(self, points: int):
+        """Keep track of the write points used in the last day"""
+        now = time.time()
+        self.connection.execute("DELETE FROM writes WHERE time < ?", (now - 86400,))
+        self.connection.execute(
+            "INSERT INTO writes (time, points) VALUES (?, ?)", (now, points)
+        )
+
+    def write_points_since(self, timestamp: float) -> tuple[int, float | None]:
+        """Return the write points used since the timestamp, and when the first
+        of those writes was"""
+        return self.connection.execute(
+            "SELECT coalesce(sum(points), 0), min(time) FROM writes WHERE time > ?",
+            (timestamp,),
+        ).fetchone()
+
+    def checkpoint(self):
+        self.connection.commit()
+
+    def save(self):
+        start = time.time()
+        self.checkpoint()
         duration = time.time() - start
         console.log(f"saved state in {duration} seconds")
 
@@ -62,6 +261,7 @@ class State(pydantic.BaseModel):
             yield state
         finally:
             state.save()
+            state.connection.close()
 
 
 def keep_session_updated(client, state):
@@ -73,7 +273,146 @@ def keep_session_updated(client, state):
     client.on_session_change(on_session_change)
 
 
-async def update_block_list(client, block_list):
+def httpx_client(client: atproto.AsyncClient):
+    """Return the httpx.AsyncClient that an atproto client makes requests with
+
+    atproto (as of 0.0.56) doesn't give access to the headers of successful
+    responses, or any hook for them, so this reaches into its private
+    attribute. If a future version moves it, this is the only place that
+    needs to change.
+    """
+    return client.request._client
+
+
+class RequestScheduler:
+    """Makes requests to the PDS as fast as it allows, but no faster
+
+    At most `max_in_flight` requests are made at once, and a token bucket
+    limits them to `requests_per_second`. Once it's watching a client, the
+    bucket slows down to spread what's left of the PDS's rate limit (from the
+    ratelimit-* response headers) evenly over the rest of the window, and
+    stops until the window resets if there's nothing left.
+
+    Requests that are rate limited (429), fail on the server (5xx) or time out
+    are retried, after a random (jittered) exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 10,
+        requests_per_second: float = 10.0,
+        max_attempts: int = 6,
+    ):
+        self.max_in_flight = max_in_flight
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.max_rate = requests_per_second
+        self.rate = requests_per_second
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.max_attempts = max_attempts
+        self.lock = asyncio.Lock()
+
+    def watch(self, client):
+        """Follow the rate limit headers of every response the client gets"""
+
+        async def on_response(response):
+            self.update_rate_limit(response.headers)
+
+        httpx_client(client).event_hooks["response"].append(on_response)
+
+    def update_rate_limit(self, headers):
+        try:
+            remaining = int(headers["ratelimit-remaining"])
+            reset = float(headers["ratelimit-reset"])
+        except (KeyError, ValueError):
+            return
+        seconds_left = max(reset - time.time(), 1.0)
+        if remaining <= 0:
+            console.log(f"rate limit used up, waiting {seconds_left:.0f} seconds")
+            self.paused_until = time.monotonic() + seconds_left
+        self.rate = min(self.max_rate, max(remaining, 1) / seconds_left)
+
+    async def take_token(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                # Allow a burst of up to a second's worth of requests
+                self.tokens = min(
+                    max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+    @staticmethod
+    def was_rate_limited(error: exceptions.RequestErrorBase) -> bool:
+        """Whether the request was turned away by the rate limit (and so
+        definitely didn't do anything, which is the only time it's safe to
+        retry a request that isn't idempotent)"""
+        return error.response is not None and error.response.status_code == 429
+
+    @staticmethod
+    def should_retry(error: exceptions.RequestErrorBase) -> bool:
+        if error.response is None:
+            # Timeouts and connection errors
+            return isinstance(error, exceptions.NetworkError)
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+
+    async def run(self, request, retry=None):
+        """Return the result of `await request()`, which makes one request
+
+        `retry(error)` decides which errors are retried, should_retry() by
+        default.
+        """
+        retry = retry or self.should_retry
+        async with self.semaphore:
+            for attempt in range(1, self.max_attempts + 1):
+                await self.take_token()
+                try:
+                    return await request()
+                except exceptions.RequestErrorBase as error:
+                    if attempt == self.max_attempts or not retry(error):
+                        raise
+                    if error.response is not None:
+                        self.update_rate_limit(error.response.headers)
+                    delay = random.uniform(0, min(60.0, 2.0**attempt))
+                    console.log(f"retrying in {delay:.1f} seconds after {error!r}")
+                    await asyncio.sleep(delay)
+
+    async def run_all(self, function, items):
+        """Call `function(item)` for every item, and return the items that
+        failed and why
+
+        A failure doesn't stop the rest of them from running. A cancellation
+        does, and is raised.
+        """
+        results = await asyncio.gather(
+            *(self.run(lambda item=item: function(item)) for item in items),
+            return_exceptions=True,
+        )
+        failures = []
+        for item, result in zip(items, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                failures.append((item, result))
+        return failures
+
+
+async def update_block_list(client, block_list, full=False):
+    """Add new block records to the block list
+
+    Records are listed newest first, so this normally stops at the first page
+    with a record that's already in the list. `full` fetches every page, for
+    when there might be records missing from further back.
+    """
     cursor = None
     overlap = False
     new_records = 0
@@ -93,7 +432,7 @@ async def update_block_list(client, block_list):
         if cursor is None:
             console.log("last page fetched")
             break
-        if overlap:
+        if overlap and not full:
             console.log("fetched all new records")
             break
     console.log(f"new block records: {new_records}")
@@ -110,17 +449,56 @@ async def unblock_rkey(client, block_list, rkey):
         console.print(f"failed to unblock [link={link}]{did}[/link]")
 
 
-async def randomly_unblock(client, block_list, probability):
+async def unblock_rkeys_batched(client, block_list, rkeys):
+    """Delete up to 200 block records in a single applyWrites request"""
+    writes = [
+        atproto.models.com.atproto.repo.apply_writes.Delete(
+            collection="app.bsky.graph.block", rkey=rkey
+        )
+        for rkey in rkeys
+    ]
+    response = await client.com.atproto.repo.apply_writes(
+        data=atproto.models.com.atproto.repo.apply_writes.Data(
+            repo=client.me.did, writes=writes
+        )
+    )
+    # applyWrites is all or nothing, and older PDSes don't return any results
+    results = response.results or [None] * len(rkeys)
+    for rkey, result in zip(rkeys, results):
+        did = block_list[rkey]
+        link = f"https://bsky.app/profile/{did}"
+        if result is None or isinstance(
+            result, atproto.models.com.atproto.repo.apply_writes.DeleteResult
+        ):
+            del block_list[rkey]
+            console.print(f"unblocked [link={link}]{did}[/link]")
+        else:
+            console.print(f"failed to unblock [link={link}]{did}[/link]")
+
+
+async def randomly_unblock(client, block_list, probability, scheduler, batch=True):
     all_items = list(block_list.items())
     num = random.binomialvariate(len(all_items), probability)
     console.log(f"unblocking {num} out of {len(all_items)}")
     chosen_items = random.sample(all_items, num)
+    rkeys = [rkey for rkey, did in chosen_items]
 
-    async with asyncio.TaskGroup() as task_group:
-        for uri, record in chosen_items:
-            task_group.create_task(
-                unblock_rkey(client, block_list, uri), name=f"unblock {uri}"
-            )
+    if batch:
+        failures = await scheduler.run_all(
+            lambda rkey_batch: unblock_rkeys_batched(client, block_list, rkey_batch),
+            list(itertools.batched(rkeys, 200)),
+        )
+        # One bad record (e.g. one that's already been deleted) fails its
+        # whole batch, so retry the records in failed batches one at a time
+        rkeys = [rkey for rkey_batch, error in failures for rkey in rkey_batch]
+        if rkeys:
+            console.log(f"unblocking {len(rkeys)} from failed batches one by one")
+
+    failures = await scheduler.run_all(
+        lambda rkey: unblock_rkey(client, block_list, rkey), rkeys
+    )
+    for rkey, error in failures:
+        console.print(f"failed to unblock {rkey}: {escape(repr(error))}")
 
 
 def calculate_decay_probability(time, half_life):
@@ -145,7 +523,13 @@ async def get_client(state: State) -> atproto.AsyncClient:
     return client
 
 
-async def half_life_unblocker_main(state: State, half_life: float, threshold: float):
+async def half_life_unblocker_main(
+    state: State,
+    half_life: float,
+    threshold: float,
+    scheduler: RequestScheduler,
+    batch: bool,
+):
     current_daystamp = daystamp()
     time_period = current_daystamp - state.last_unblock_run_daystamp
     probability = calculate_decay_probability(time_period, half_life)
@@ -157,10 +541,13 @@ async def half_life_unblocker_main(state: State, half_life: float, threshold: fl
         return
 
     client = await get_client(state)
+    scheduler.watch(client)
     await update_block_list(client, state.app_bsky_graph_block_list)
 
     state.last_unblock_run_daystamp = current_daystamp
-    await randomly_unblock(client, state.app_bsky_graph_block_list, probability)
+    await randomly_unblock(
+        client, state.app_bsky_graph_block_list, probability, scheduler, batch
+    )
 
     console.log(f"number of block records: {len(state.app_bsky_graph_block_list)}")
 
@@ -211,55 +598,190 @@ async def add_followers_to_block_queue(state: State, handle: str):
 #         console.log(f"Blocked {did}", highlight=False)
 #
 
-async def run_block_queue_batched(state: State):
+async def block_dids_batched(client, state: State, dids) -> bool:
+    """Block up to 200 dids in a single applyWrites request, and checkpoint
+
+    Returns whether the new records were added to the block list, which they
+    can't be if the PDS doesn't say what their rkeys are.
+    """
+    writes = []
+    for did in dids:
+        create = atproto.models.com.atproto.repo.apply_writes.Create(
+            collection="app.bsky.graph.block",
+            value=atproto.models.app.bsky.graph.block.Record(
+                created_at=client.get_current_time_iso(),
+                subject=did,
+            ),
+        )
+        writes.append(create)
+    response = await client.com.atproto.repo.apply_writes(
+        data=atproto.models.com.atproto.repo.apply_writes.Data(
+            repo=client.me.did, writes=writes
+        )
+    )
+    state.record_writes(len(dids) * CREATE_POINTS)
+    # applyWrites is all or nothing, and older PDSes don't return any results
+    results = response.results or [None] * len(dids)
+    for did, result in zip(dids, results):
+        if result is not None:
+            at_uri = atproto.AtUri.from_str(result.uri)
+            state.app_bsky_graph_block_list[at_uri.rkey] = did
+        state.block_queue.discard(did)
+        link = f"https://bsky.app/profile/{did}"
+        console.print(f"blocked [link={link}]{did}[/link]")
+    # So that a run that crashes after this doesn't block them again
+    state.checkpoint()
+    return response.results is not None
+
+
+async def wait_for_write_points(
+    state: State,
+    points: collections.abc.Callable[[], int],
+    daily_points: int,
+    hourly_points: int,
+) -> bool:
+    """Wait until `points()` more write points fit in the hourly limit, return
+    False if they don't fit in the daily limit
+
+    `points` is called again every time it's checked, because batches in
+    flight that finish while waiting have their points recorded as writes
+    instead."""
+    while True:
+        now = time.time()
+        points_needed = points()
+        used_today, _ = state.write_points_since(now - 86400)
+        if used_today + points_needed > daily_points:
+            return False
+        used_this_hour, first_write = state.write_points_since(now - 3600)
+        if used_this_hour + points_needed <= hourly_points:
+            return True
+        # Wait for the oldest write to be more than an hour old (or for the
+        # batches in flight to finish)
+        wait = first_write + 3600 - now if first_write else 1.0
+        console.log(f"hourly write limit reached, waiting {wait:.0f} seconds")
+        await asyncio.sleep(max(wait, 1.0))
+
+
+async def run_block_queue_batched(
+    state: State,
+    scheduler: RequestScheduler,
+    daily_points: int = DAILY_WRITE_POINTS,
+    hourly_points: int = HOURLY_WRITE_POINTS,
+):
+    """Block everyone in the block queue, or as many as the daily write limit
+    allows, with several batches in flight at once"""
     batch_size = 200
-    count = 0
     client = await get_client(state)
-    all_currently_blocked_dids = set(state.app_bsky_graph_block_list.values())
-    state.block_queue -= all_currently_blocked_dids
+    scheduler.watch(client)
+    # Pick up records from a run that was stopped before it saved them. Those
+    # could be anywhere in the list if batches were left unconfirmed.
+    full = state.unconfirmed_block_batches > 0
+    if full:
+        console.log("fetching every block record to find unconfirmed blocks")
+    await update_block_list(client, state.app_bsky_graph_block_list, full=full)
+    state.unconfirmed_block_batches = 0
+    state.remove_blocked_from_queue()
+    state.checkpoint()
     block_queue_list = list(state.block_queue)
-    for batch in itertools.batched(block_queue_list, batch_size):
-        writes = []
-        for did in batch:
-            create = atproto.models.com.atproto.repo.apply_writes.Create(
-                collection="app.bsky.graph.block",
-                value=atproto.models.app.bsky.graph.block.Record(
-                    created_at=client.get_current_time_iso(),
-                    subject=did,
-                ),
+    console.log(f"blocking {len(block_queue_list)} accounts")
+
+    start = time.monotonic()
+    blocked = 0
+    # Write points of the batches that are in flight
+    reserved = 0
+    tasks = set()
+
+    async def run_batch(batch):
+        nonlocal blocked, reserved
+        # Until it's known what happened to the batch, the next run has to
+        # check every block record for it
+        state.unconfirmed_block_batches += 1
+        state.checkpoint()
+        try:
+            # Creating records isn't idempotent, a batch that failed any other
+            # way might have been written, and retrying it would block twice
+            confirmed = await scheduler.run(
+                lambda: block_dids_batched(client, state, batch),
+                retry=RequestScheduler.was_rate_limited,
             )
-            writes.append(create)
-        response = await client.com.atproto.repo.apply_writes(
-            data=atproto.models.com.atproto.repo.apply_writes.Data(
-                repo=client.me.did, writes=writes
+        except Exception as error:
+            if isinstance(error, exceptions.RequestErrorBase) and (
+                error.response is not None and error.response.status_code < 500
+            ):
+                # Turned away, so nothing was written
+                state.unconfirmed_block_batches -= 1
+            else:
+                # It might have been written, and used up the write points
+                state.record_writes(len(batch) * CREATE_POINTS)
+            state.checkpoint()
+            console.print(
+                "failed to block a batch, it's left in the queue: "
+                f"{escape(repr(error))}"
             )
+            return
+        finally:
+            reserved -= len(batch) * CREATE_POINTS
+        if confirmed:
+            state.unconfirmed_block_batches -= 1
+            state.checkpoint()
+        blocked += len(batch)
+        elapsed = time.monotonic() - start
+        console.log(
+            f"blocked {blocked} in {elapsed:.0f} seconds "
+            f"({blocked / elapsed:.1f} per second), "
+            f"{len(state.block_queue)} left in the queue"
         )
-        for r, result in enumerate(response.results):
-            print(result.validation_status)
-            did = batch[r]
-            at_uri = atproto.AtUri.from_str(result.uri)
-            state.app_bsky_graph_block_list[at_uri.rkey] = batch[r]
-            state.block_queue.remove(did)
-            link = f"https://bsky.app/profile/{did}"
-            console.print(f"blocked [link={link}]{did}[/link]")
-        count += batch_size
-        if count >= 1_000:
+
+    for batch in itertools.batched(block_queue_list, batch_size):
+        points = len(batch) * CREATE_POINTS
+        if not await wait_for_write_points(
+            state, lambda: reserved + points, daily_points, hourly_points
+        ):
+            console.log("daily write limit reached, run again tomorrow")
             break
+        reserved += points
+        task = asyncio.create_task(run_batch(batch))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        if len(tasks) >= scheduler.max_in_flight:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    if tasks:
+        await asyncio.wait(tasks)
+
 
 async def update_block_list_main(state: State):
     client = await get_client(state)
     await update_block_list(client, state.app_bsky_graph_block_list)
 
 @app.command()
-def unblock(half_life: float = 365.25 / 2, threshold: float = 0.002):
+def unblock(
+    half_life: float = 365.25 / 2,
+    threshold: float = 0.002,
+    max_in_flight: int = 10,
+    requests_per_second: float = 10.0,
+    batch: bool = True,
+):
+    scheduler = RequestScheduler(max_in_flight, requests_per_second)
     with State.auto_load_and_save() as state:
-        asyncio.run(half_life_unblocker_main(state, half_life, threshold))
+        asyncio.run(
+            half_life_unblocker_main(state, half_life, threshold, scheduler, batch)
+        )
 
 
 @app.command()
-def block():
+def block(
+    max_in_flight: int = 4,
+    requests_per_second: float = 10.0,
+    daily_points: int = DAILY_WRITE_POINTS,
+    hourly_points: int = HOURLY_WRITE_POINTS,
+):
+    scheduler = RequestScheduler(max_in_flight, requests_per_second)
     with State.auto_load_and_save() as state:
-        asyncio.run(run_block_queue_batched(state))
+        asyncio.run(
+            run_block_queue_batched(state, scheduler, daily_points, hourly_points)
+        )
+
+
 @app.command()
 def update():
     with State.auto_load_and_save() as state:
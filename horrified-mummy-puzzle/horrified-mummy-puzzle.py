@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 
 import sys
-from typing import Final
+import math
+import struct
+import bisect
+import functools
+import time
+import heapq
+import random
+import array
+import pathlib
+import collections
+from typing import Final, Iterable
 from itertools import permutations, product, pairwise
 
-import networkx
-
 
 def mod6(i: int) -> int:
     "Like %6 but 0 is 6"
@@ -54,16 +62,30 @@ def all_moves(board):
 # Generate the complete state space for the board: every possible
 # configuration of the board the moves that transition one board
 # to the next.
-g = networkx.Graph()
-for board in permutations(goal):
-    g.add_node(board)
-    for m, b in all_moves(board).items():
-        g.add_node(b)
-        g.add_edge(board, b, data=str(m))
+def build_graph():
+    # networkx takes a while to import, and solve() doesn't need it
+    import networkx
 
+    g = networkx.Graph()
+    for board in permutations(goal):
+        g.add_node(board)
+        for m, b in all_moves(board).items():
+            g.add_node(b)
+            g.add_edge(board, b, data=str(m))
+    return g
 
-def solve(starting_position):
+
+@functools.cache
+def graph():
+    """Return the state space graph, building it the first time"""
+    return build_graph()
+
+
+def solve_with_graph(starting_position):
     """Return the shortest path from the staring position to the goal"""
+    import networkx
+
+    g = graph()
     sp = networkx.shortest_path(g, starting_position, goal)
     solution = []
     for pair in pairwise(sp):
@@ -71,18 +93,491 @@ def solve(starting_position):
     return solution
 
 
-def solve_argv():
-    """Parse the first argument to the script and solve that board"""
-    input_str = sys.argv[1]
+def rank(board: tuple[int]) -> int:
+    """Return the index of the board in permutations(goal) (its Lehmer code)"""
+    result = 0
+    remaining = sorted(board)
+    for i, tile in enumerate(board):
+        j = remaining.index(tile)
+        del remaining[j]
+        result = result * (len(board) - i) + j
+    return result
+
+
+# A much leaner version of the same state space than the networkx graph. Each
+# board is just its rank, and the boards one move away from board r are in
+# neighbors[r * MAX_DEGREE : (r + 1) * MAX_DEGREE] (padded with NO_BOARD), with
+# the tile that moved to get to each of them in the same place in `tiles`.
+MAX_DEGREE: Final = max(len(connections(i)) for i in goal)
+NO_BOARD: Final = 0xFFFF
+
+
+def build_state_space() -> tuple[array.array, bytearray]:
+    """Return the (neighbors, tiles) arrays for every board"""
+    size = math.factorial(len(goal))
+    neighbors = array.array("H", [NO_BOARD]) * (size * MAX_DEGREE)
+    tiles = bytearray(size * MAX_DEGREE)
+    # permutations(goal) comes out in rank order
+    for r, board in enumerate(permutations(goal)):
+        blank = board.index(0)
+        positions = sorted(connections(blank), key=board.__getitem__)
+        for k, position in enumerate(positions, start=r * MAX_DEGREE):
+            next_board = list(board)
+            next_board[blank], next_board[position] = board[position], 0
+            neighbors[k] = rank(next_board)
+            tiles[k] = board[position]
+    return neighbors, tiles
+
+
+def breadth_first_search(
+    neighbors: array.array, tiles: bytearray, source: int
+) -> tuple[bytearray, bytearray]:
+    """Return the distance to source from every board, and the tile to move
+    to get one step closer"""
+    size = len(neighbors) // MAX_DEGREE
+    distance = bytearray(b"\xff") * size
+    next_move = bytearray(size)
+    distance[source] = 0
+    # The queue is every board in the order they're found
+    queue = array.array("H", [source])
+    for r in queue:
+        for k in range(r * MAX_DEGREE, (r + 1) * MAX_DEGREE):
+            n = neighbors[k]
+            if n == NO_BOARD:
+                break
+            if distance[n] == 0xFF:
+                distance[n] = distance[r] + 1
+                # Moving the same tile back again is one step closer to source
+                next_move[n] = tiles[k]
+                queue.append(n)
+    return distance, next_move
+
+
+# Because there's only one goal, a single breadth first search backwards from
+# the goal finds the best move from every board. And because the board is
+# symmetrical, only one of each set of symmetric boards needs to be searched
+# and stored (see Puzzle.canonical). The table is the rank of each of those
+# (2 bytes) followed by the tile to move next (0 for the goal), in rank order.
+TABLE_PATH: Final = pathlib.Path(__file__).with_suffix(".table")
+TABLE_ENTRY: Final = struct.Struct("<HB")
+
+
+def build_next_move_table() -> bytes:
+    """Return the tile to move next from every canonical board"""
+    next_moves = mummy_puzzle.reduced_next_moves()
+    return b"".join(
+        TABLE_ENTRY.pack(rank(board), tile)
+        for board, tile in sorted(next_moves.items())
+    )
+
+
+def parse_next_move_table(table: bytes) -> tuple[array.array, bytes] | None:
+    """Return the ranks and next moves in a table, or None if it isn't a valid
+    table (e.g. a stale one, in the format of an older version of the script)"""
+    if not table or len(table) % TABLE_ENTRY.size:
+        return None
+    ranks, tiles = zip(*TABLE_ENTRY.iter_unpack(table))
+    if (
+        ranks[0] != rank(goal)
+        or tiles[0] != 0
+        or any(a >= b for a, b in pairwise(ranks))
+        or ranks[-1] >= math.factorial(len(goal))
+        or not all(0 < tile < len(goal) for tile in tiles[1:])
+    ):
+        return None
+    return array.array("H", ranks), bytes(tiles)
+
+
+@functools.cache
+def next_move_table() -> tuple[array.array, bytes]:
+    """Return the ranks and next moves from TABLE_PATH, building it if it isn't
+    there (or isn't valid)
+
+    It's only loaded the first time it's needed."""
+    try:
+        parsed = parse_next_move_table(TABLE_PATH.read_bytes())
+    except FileNotFoundError:
+        parsed = None
+    if parsed is None:
+        table = build_next_move_table()
+        TABLE_PATH.write_bytes(table)
+        parsed = parse_next_move_table(table)
+        assert parsed is not None
+    return parsed
+
+
+def next_move(canonical_board: tuple[int]) -> int:
+    """Return the tile to move next from a canonical board"""
+    ranks, tiles = next_move_table()
+    r = rank(canonical_board)
+    i = bisect.bisect_left(ranks, r)
+    if i == len(ranks) or ranks[i] != r:
+        raise ValueError(f"{canonical_board} isn't in the next move table")
+    return tiles[i]
+
+
+def solve(starting_position):
+    """Return the shortest path from the staring position to the goal"""
+    if sorted(starting_position) != sorted(goal):
+        raise ValueError(f"{starting_position} isn't an arrangement of {goal}")
+    return mummy_puzzle.solve_with_table(starting_position, next_move)
+
+
+# Everything above is specific to the mummy's board. Puzzle solves the same kind
+# of sliding tile puzzle on any board: `adjacency` is the spaces each space is
+# connected to, and `goal` the tile that should end up on each space (0 is the
+# empty space). Spaces and tiles have to be numbered 0, 1, 2, ...
+# `starting_positions` are the boards a game can start from, if there are any
+# in particular.
+
+
+def automorphisms(adjacency: dict[int, list[int]], fixed: int) -> list[tuple[int]]:
+    """Return every way of renumbering the spaces that keeps the same spaces
+    connected to each other, and leaves the `fixed` space where it is
+
+    Each one is a tuple of the new number of each space.
+    """
+    # Renumber the spaces in breadth first order, so that most of them are
+    # next to one that's already been renumbered and there are few choices
+    order = [fixed]
+    for space in order:
+        order.extend(s for s in adjacency[space] if s not in order)
+    order.extend(s for s in sorted(adjacency) if s not in order)
+
+    results = []
+    mapping = {}
+
+    def extend(i: int) -> None:
+        if i == len(order):
+            results.append(tuple(mapping[space] for space in sorted(adjacency)))
+            return
+        space = order[i]
+        used = set(mapping.values())
+        for candidate in [fixed] if i == 0 else sorted(adjacency):
+            if candidate in used or len(adjacency[candidate]) != len(adjacency[space]):
+                continue
+            if all(
+                (other in adjacency[space]) == (mapped in adjacency[candidate])
+                for other, mapped in mapping.items()
+            ):
+                mapping[space] = candidate
+                extend(i + 1)
+                del mapping[space]
+
+    extend(0)
+    return results
+
+
+def ring_board(spaces: int = 6) -> dict[int, set[int]]:
+    """The mummy's board with any number of spaces around the center"""
+    adjacency = {0: set(range(1, spaces + 1))}
+    for i in range(1, spaces + 1):
+        adjacency[i] = {0, (i - 2) % spaces + 1, i % spaces + 1}
+    return adjacency
+
+
+def two_ring_board(spaces: int = 6) -> dict[int, set[int]]:
+    """A ring board with a second ring of `spaces` spaces around the outside,
+    each one connected to the space next to it on the inner ring"""
+    adjacency = ring_board(spaces)
+    for i in range(1, spaces + 1):
+        outer = spaces + i
+        adjacency[i].add(outer)
+        adjacency[outer] = {i, (i - 2) % spaces + spaces + 1, i % spaces + spaces + 1}
+    return adjacency
+
+
+def moved_tiles(boards: list[tuple[int]]) -> list[str]:
+    """Return the tile moved between each pair of boards in a path"""
+    return [str(a[b.index(0)]) for a, b in pairwise(boards)]
+
+
+class Puzzle:
+    def __init__(
+        self,
+        adjacency: dict[int, set[int]],
+        goal: tuple[int],
+        starting_positions: Iterable[tuple[int]] = (),
+    ) -> None:
+        self.adjacency = {space: sorted(spaces) for space, spaces in adjacency.items()}
+        self.goal = tuple(goal)
+        self.starting_positions = list(starting_positions)
+        self.goal_space = {tile: space for space, tile in enumerate(self.goal)}
+        # The shortest distance between every pair of spaces
+        self.distances = {
+            space: self._distances_from(space) for space in self.adjacency
+        }
+
+    def _distances_from(self, start: int) -> dict[int, int]:
+        distances = {start: 0}
+        queue = collections.deque([start])
+        while queue:
+            space = queue.popleft()
+            for next_space in self.adjacency[space]:
+                if next_space not in distances:
+                    distances[next_space] = distances[space] + 1
+                    queue.append(next_space)
+        return distances
+
+    def neighbors(self, board: tuple[int]) -> list[tuple[int]]:
+        """Return every board one move away"""
+        blank = board.index(0)
+        result = []
+        for space in self.adjacency[blank]:
+            next_board = list(board)
+            next_board[blank], next_board[space] = board[space], 0
+            result.append(tuple(next_board))
+        return result
+
+    @functools.cached_property
+    def symmetries(self) -> list[tuple[tuple[int], tuple[int]]]:
+        """Every symmetry of the board, as (space map, tile map) pairs
+
+        A symmetry moves the tile on space s to space_map[s] and renumbers it
+        tile_map[tile]. The board is connected the same way afterwards and the
+        goal doesn't change, so the new board takes just as many moves to
+        solve as the old one, with the same (renumbered) tiles moving.
+        """
+        return [
+            (
+                space_map,
+                tuple(
+                    self.goal[space_map[self.goal_space[tile]]]
+                    for tile in range(len(self.goal))
+                ),
+            )
+            for space_map in automorphisms(self.adjacency, self.goal_space[0])
+        ]
+
+    @staticmethod
+    def transform(board: tuple[int], symmetry) -> tuple[int]:
+        space_map, tile_map = symmetry
+        result = [0] * len(board)
+        for space, tile in enumerate(board):
+            result[space_map[space]] = tile_map[tile]
+        return tuple(result)
+
+    def canonical(self, board: tuple[int]):
+        """Return the first (smallest) of the board's symmetric versions, and
+        the symmetry that turns the board into it"""
+        return min(
+            (self.transform(board, symmetry), symmetry) for symmetry in self.symmetries
+        )
+
+    def reduced_next_moves(self) -> dict[tuple[int], int]:
+        """Return the tile to move next from every canonical board, numbered
+        as on the canonical board (0 for the goal)
+
+        It's a breadth first search backwards from the goal that only visits
+        canonical boards, so it only has to search a fraction of the boards.
+        """
+        next_moves = {self.goal: 0}
+        queue = collections.deque([self.goal])
+        while queue:
+            board = queue.popleft()
+            for next_board in self.neighbors(board):
+                canonical, (_, tile_map) = self.canonical(next_board)
+                if canonical not in next_moves:
+                    # Moving the same tile back again is one step closer
+                    tile = board[next_board.index(0)]
+                    next_moves[canonical] = tile_map[tile]
+                    queue.append(canonical)
+        return next_moves
+
+    def solve_with_table(self, starting_position: tuple[int], next_move) -> list[str]:
+        """Return the shortest solution, following a table of next moves from
+        canonical boards like reduced_next_moves()
+
+        `next_move` is called with each canonical board and returns the tile
+        to move next, on the canonical board.
+        """
+        solution = []
+        board = tuple(starting_position)
+        # No shortest solution visits a board twice, so a table that takes
+        # longer than that is wrong
+        for _ in range(math.factorial(len(board))):
+            canonical, (_, tile_map) = self.canonical(board)
+            if not (tile := next_move(canonical)):
+                return solution
+            # The same tile on the real board
+            tile = tile_map.index(tile)
+            if board.index(tile) not in self.adjacency[board.index(0)]:
+                raise ValueError(f"the table moves {tile}, which can't move on {board}")
+            solution.append(str(tile))
+            board = move(board, tile)
+        raise ValueError(f"the table doesn't lead from {starting_position} to the goal")
+
+    def scramble(self, moves: int, seed: int | None = None) -> tuple[int]:
+        """Return the board after `moves` random moves from the goal"""
+        rng = random.Random(seed)
+        board = self.goal
+        for _ in range(moves):
+            board = rng.choice(self.neighbors(board))
+        return board
+
+    def solve_bidirectional(self, starting_position: tuple[int]) -> list[str]:
+        """Return the shortest solution, by breadth first search from both ends"""
+        start = tuple(starting_position)
+        if start == self.goal:
+            return []
+        # board: the board before it in the search from that end
+        parents = ({start: None}, {self.goal: None})
+        frontiers = [[start], [self.goal]]
+        while frontiers[0] and frontiers[1]:
+            # Search a level deeper from whichever end has fewer boards to expand
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            these, others = parents[side], parents[1 - side]
+            next_frontier = []
+            for board in frontiers[side]:
+                for next_board in self.neighbors(board):
+                    if next_board in these:
+                        continue
+                    these[next_board] = board
+                    if next_board in others:
+                        return moved_tiles(self._join(parents, next_board))
+                    next_frontier.append(next_board)
+            frontiers[side] = next_frontier
+        raise ValueError(f"{start} can't be solved")
+
+    @staticmethod
+    def _join(parents, meeting: tuple[int]) -> list[tuple[int]]:
+        path = []
+        board = meeting
+        while board is not None:
+            path.append(board)
+            board = parents[0][board]
+        path.reverse()
+        board = parents[1][meeting]
+        while board is not None:
+            path.append(board)
+            board = parents[1][board]
+        return path
+
+    def distance_heuristic(self, board: tuple[int]) -> int:
+        """The sum of how far every tile is from its goal space
+
+        Every move moves one tile one space, so the solution can't be shorter.
+        """
+        return sum(
+            self.distances[space][self.goal_space[tile]]
+            for space, tile in enumerate(board)
+            if tile
+        )
+
+    def solve_astar(self, starting_position: tuple[int], heuristic=None) -> list[str]:
+        """Return the shortest solution, by A* search
+
+        The heuristic has to be admissible (never more than the real number of
+        moves left) for the solution to be the shortest one. The default is
+        distance_heuristic, a PatternDatabase is slower to build but better.
+        """
+        heuristic = heuristic or self.distance_heuristic
+        start = tuple(starting_position)
+        parents = {start: None}
+        moves = {start: 0}
+        # (estimated total moves, moves so far, tie breaker, board)
+        queue = [(heuristic(start), 0, 0, start)]
+        counter = 1
+        while queue:
+            _, moves_so_far, _, board = heapq.heappop(queue)
+            if board == self.goal:
+                path = []
+                while board is not None:
+                    path.append(board)
+                    board = parents[board]
+                return moved_tiles(path[::-1])
+            if moves_so_far > moves[board]:
+                # A shorter way to this board was found after it was queued
+                continue
+            for next_board in self.neighbors(board):
+                if moves_so_far + 1 < moves.get(next_board, sys.maxsize):
+                    moves[next_board] = moves_so_far + 1
+                    parents[next_board] = board
+                    estimate = moves_so_far + 1 + heuristic(next_board)
+                    heapq.heappush(
+                        queue, (estimate, moves_so_far + 1, counter, next_board)
+                    )
+                    counter += 1
+        raise ValueError(f"{start} can't be solved")
+
+
+class PatternDatabase:
+    """An admissible heuristic for Puzzle.solve_astar from additive pattern
+    databases
+
+    The tiles are split into groups (patterns) of `pattern_size`. For each
+    pattern, a breadth first search from the goal finds the fewest moves of
+    just that pattern's tiles needed to get them to their goal spaces, from
+    every placement of those tiles and the empty space (the other tiles are
+    treated as interchangeable and moving them is free). No move moves tiles
+    from two patterns, so the sum over all the patterns is still never more
+    than the real number of moves left.
+    """
+
+    def __init__(self, puzzle: Puzzle, pattern_size: int = 3) -> None:
+        self.puzzle = puzzle
+        tiles = sorted(tile for tile in puzzle.goal if tile)
+        self.patterns = [
+            tiles[i : i + pattern_size] for i in range(0, len(tiles), pattern_size)
+        ]
+        self.tables = [self._build(pattern) for pattern in self.patterns]
+
+    def _build(self, pattern: list[int]) -> dict[tuple[int, ...], int]:
+        """Return the fewest moves for every (empty space, *pattern tile spaces)"""
+        adjacency = self.puzzle.adjacency
+        start = (self.puzzle.goal_space[0],) + tuple(
+            self.puzzle.goal_space[tile] for tile in pattern
+        )
+        table = {start: 0}
+        # Moving a tile from outside the pattern is free, so this is a 0-1
+        # breadth first search: free moves go on the front of the queue
+        queue = collections.deque([start])
+        while queue:
+            state = queue.popleft()
+            cost = table[state]
+            blank, spaces = state[0], state[1:]
+            for space in adjacency[blank]:
+                if space in spaces:
+                    i = spaces.index(space)
+                    next_state = (space,) + spaces[:i] + (blank,) + spaces[i + 1 :]
+                    next_cost = cost + 1
+                else:
+                    next_state = (space,) + spaces
+                    next_cost = cost
+                if next_cost < table.get(next_state, sys.maxsize):
+                    table[next_state] = next_cost
+                    if next_cost == cost:
+                        queue.appendleft(next_state)
+                    else:
+                        queue.append(next_state)
+        return table
+
+    def __call__(self, board: tuple[int]) -> int:
+        space_of = {tile: space for space, tile in enumerate(board)}
+        blank = space_of[0]
+        return sum(
+            table[(blank,) + tuple(space_of[tile] for tile in pattern)]
+            for pattern, table in zip(self.patterns, self.tables)
+        )
+
+
+mummy_puzzle: Final = Puzzle(
+    {space: connections(space) for space in goal}, goal, starting_positions
+)
+
+
+def solve_argv(solver=solve):
+    """Parse the last argument to the script and solve that board"""
+    input_str = sys.argv[-1]
     starting_position = tuple(int(i) for i in input_str if i.isdigit())
     print(f"{starting_position=}")
-    solution = solve(starting_position)
+    solution = solver(starting_position)
     print(starting_position, f"solved in {len(solution)} moves", solution)
 
 
 def solve_all_starting_positions():
     """Print the solutions to every valid starting board in the game"""
-    for starting_position in starting_positions:
+    for starting_position in mummy_puzzle.starting_positions:
         solution = solve(starting_position)
         print(
             starting_position,
@@ -93,8 +588,98 @@ def solve_all_starting_positions():
         print()
 
 
+def measure(function) -> tuple[float, int]:
+    """Return the seconds it takes to call function, and the peak memory used
+
+    The memory is measured in a second call, because tracing memory
+    allocations slows everything down."""
+    import tracemalloc
+
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def compare_engines():
+    """Print the time and memory it takes to build the state space and search
+    it, with networkx, with the integer arrays, and only the canonical boards"""
+    import networkx
+
+    engines = {
+        "networkx": lambda: networkx.single_source_shortest_path(build_graph(), goal),
+        "arrays": lambda: breadth_first_search(*build_state_space(), rank(goal)),
+        "symmetry": lambda: Puzzle(ring_board(6), goal).reduced_next_moves(),
+    }
+    for name, engine in engines.items():
+        seconds, peak = measure(engine)
+        print(f"{name:<10} {seconds * 1000:>8.1f} ms {peak / 1024:>10,.0f} KiB")
+
+
+def benchmark_board_sizes():
+    """Print how long each search takes to solve scrambled boards of each size"""
+    boards = [(f"ring {n}", ring_board(n)) for n in range(4, 9)]
+    boards += [(f"two ring {n}", two_ring_board(n)) for n in range(3, 7)]
+    print(
+        f"{'board':<12} {'spaces':>6} {'moves':>5} {'bidirectional':>14} "
+        f"{'A*':>9} {'A* + pdb':>9} {'(pdb build)':>12}"
+    )
+    for name, adjacency in boards:
+        puzzle = Puzzle(adjacency, tuple(range(len(adjacency))))
+        start = time.perf_counter()
+        pdb = PatternDatabase(puzzle)
+        pdb_seconds = time.perf_counter() - start
+        for seed in range(3):
+            board = puzzle.scramble(1000, seed=seed)
+            times = []
+            for search in (
+                puzzle.solve_bidirectional,
+                puzzle.solve_astar,
+                lambda board: puzzle.solve_astar(board, pdb),
+            ):
+                start = time.perf_counter()
+                solution = search(board)
+                times.append(time.perf_counter() - start)
+            print(
+                f"{name:<12} {len(adjacency):>6} {len(solution):>5} "
+                f"{times[0]:>13.3f}s {times[1]:>8.3f}s {times[2]:>8.3f}s "
+                f"{pdb_seconds:>11.3f}s"
+            )
+
+
+def measure_startup(board: str = "0645132", repeat: int = 5):
+    """Print how long it takes to run the script to solve one board, with the
+    next move table and with the networkx graph"""
+    import subprocess
+
+    commands = {
+        "python": [sys.executable, "-c", "pass"],
+        "table": [sys.executable, __file__, board],
+        "networkx": [sys.executable, __file__, "--graph", board],
+    }
+    for name, command in commands.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        print(f"{name:<10} {min(times) * 1000:>8.1f} ms")
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    if sys.argv[1:] == ["--compare-engines"]:
+        compare_engines()
+    elif sys.argv[1:] == ["--benchmark"]:
+        benchmark_board_sizes()
+    elif sys.argv[1:] == ["--startup-time"]:
+        measure_startup()
+    elif len(sys.argv) == 3 and sys.argv[1] == "--graph":
+        solve_argv(solve_with_graph)
+    elif len(sys.argv) > 1:
         solve_argv()
     else:
         solve_all_starting_positions()
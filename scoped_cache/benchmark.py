@@ -0,0 +1,64 @@
+"""
+Micro-benchmark of the per-call overhead of @memoize_with_scope_cache
+
+Compares cache hits and misses against a bare functools.cache, for the
+explicit `scope_cache=` keyword, the active cache (`with ScopeCache():`)
+and a ScopeCache with a ttl (which uses the pure python PolicyCache).
+"""
+
+import time
+import functools
+
+import scoped_cache
+
+NUMBER = 500_000
+
+
+def identity(x):
+    return x
+
+
+def time_calls(func, args) -> float:
+    """Return the average nanoseconds per call of func over args"""
+    start = time.perf_counter_ns()
+    for arg in args:
+        func(arg)
+    return (time.perf_counter_ns() - start) / len(args)
+
+
+def run(name: str, make_func) -> None:
+    hits = [0] * NUMBER
+    misses = list(range(NUMBER))
+
+    func = make_func()
+    func(0)
+    hit_ns = time_calls(func, hits)
+
+    func = make_func()
+    miss_ns = time_calls(func, misses)
+
+    print(f"{name:<28} hit {hit_ns:>7,.0f} ns    miss {miss_ns:>7,.0f} ns")
+
+
+def main():
+    run("functools.cache", lambda: functools.cache(identity))
+
+    memoized = scoped_cache.memoize_with_scope_cache(identity)
+
+    def explicit(**scope_cache_kwargs):
+        cache = scoped_cache.ScopeCache(**scope_cache_kwargs)
+        return lambda x: memoized(x, scope_cache=cache)
+
+    run("scope_cache=ScopeCache()", explicit)
+    run("scope_cache=ScopeCache(ttl)", lambda: explicit(ttl=60.0))
+
+    # Entering without exiting is fine here, each one is replaced by the next
+    def active():
+        scoped_cache.ScopeCache().__enter__()
+        return memoized
+
+    run("with ScopeCache()", active)
+
+
+if __name__ == "__main__":
+    main()
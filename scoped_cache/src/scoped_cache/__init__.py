@@ -33,19 +33,575 @@ Usage:
 >>> def slow_function(*args, scope_cache: ScopeCache | None = None, **kwargs):
 >>>     ...
 
+Instead of passing the cache to every call, a ScopeCache can be made the
+active cache for a block of code. Every memoized function called inside the
+block uses it, including calls nested deep inside other functions and calls
+made from asyncio tasks created inside the block:
+
+>>> def parent_function():
+>>>     with ScopeCache():
+>>>         for i in range(50):
+>>>             slow_function()
+
+By default a ScopeCache will hold onto every result for as long as it lives.
+For long-lived scopes it can be given a policy to keep it bounded:
+
+>>> cache = ScopeCache(max_entries=10_000, max_bytes=512 * 2**20, ttl=60.0)
+
+ - `max_entries` limits the entries cached *per function* (least recently
+   used are evicted first)
+ - `max_bytes` limits the (approximate) size of the whole scope, evicting
+   the least recently used entries from any function
+ - `ttl` is how many seconds a cached result stays fresh
+
+A ScopeCache can also be given a `backend=` (see `scoped_cache.backends`)
+to share results between processes or persist them between runs.
+
 """
 
 
+import sys
+import time
+import pickle
+import asyncio
+import inspect
 import functools
+import threading
+import contextvars
+import concurrent.futures
 import collections
-from typing import Final, Callable, Any
+from typing import Final, Callable, Any, NamedTuple, Iterable, Hashable, Coroutine
 import logging
 
+from .backends import (
+    Backend,
+    SQLiteBackend,
+    SharedMemoryBackend,
+    stable_key,
+    stable_cache_key,
+)
+from .keys import structural_key, content_key, buffer_digest
+from .instrumentation import (
+    FunctionStats,
+    FunctionReport,
+    ReportHook,
+    format_report,
+    sort_reports,
+)
+
+__all__ = [
+    "Backend",
+    "CacheInfo",
+    "FunctionReport",
+    "ReportHook",
+    "SQLiteBackend",
+    "ScopeCache",
+    "SharedMemoryBackend",
+    "active_scope_cache",
+    "batch_load_with_scope_cache",
+    "buffer_digest",
+    "content_key",
+    "estimate_size",
+    "format_report",
+    "memoize_with_scope_cache",
+    "sort_reports",
+    "structural_key",
+]
+
 logger = logging.getLogger(__name__)
 
+# Set to True to debug log every call to a memoized function. It's off by
+# default because even disabled logging calls cost more than a cache hit.
+LOG_CALLS = False
+
+# The keyword argument used to pass the cache (it is spelled out in the
+# signatures of the wrappers in memoize_with_scope_cache)
 KWARG_NAME: Final = "scope_cache"
 
-ScopeCacheType = collections.UserDict[Callable, functools._lru_cache_wrapper]
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int | None
+    currsize: int
+    evictions: int
+    expirations: int
+
+
+# Makes a cache key from a call's args tuple and kwargs dict
+MakeKey = Callable[[tuple, dict], Hashable]
+
+
+def _make_key(args: tuple, kwargs: dict) -> Hashable:
+    # Without keyword arguments the args tuple is already a perfectly good
+    # key. It can never equal a key from functools._make_key, which is a list.
+    if not kwargs:
+        return args
+    return functools._make_key(args, kwargs, typed=False)
+
+
+def _user_make_key(key: Callable[..., Hashable]) -> MakeKey:
+    """Adapt a `key=` function, which takes the call's arguments, to MakeKey"""
+
+    def make_key(args: tuple, kwargs: dict) -> Hashable:
+        return key(*args, **kwargs)
+
+    return make_key
+
+
+def estimate_size(obj: Any, _seen: set[int] | None = None) -> int:
+    """Roughly estimate how many bytes `obj` uses
+
+    This is `sys.getsizeof` plus the contents of builtin containers and the
+    `__dict__` of objects. It's only meant to be good enough to keep a
+    ScopeCache inside a byte budget.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float)):
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_size(key, _seen) + estimate_size(value, _seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_size(item, _seen)
+    if hasattr(obj, "__dict__"):
+        size += estimate_size(vars(obj), _seen)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires", "tick")
+
+    def __init__(self, value: Any, size: int, expires: float, tick: int) -> None:
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.tick = tick
+
+
+class PolicyCache:
+    """A memoized function that honours the policy of its ScopeCache
+
+    It's a pure-python stand-in for `functools.lru_cache` used when the
+    ScopeCache has a byte budget or a ttl, which lru_cache can't do.
+    """
+
+    def __init__(
+        self,
+        user_function: Callable,
+        scope_cache: "ScopeCache",
+        make_key: MakeKey | None = None,
+    ) -> None:
+        self.user_function = user_function
+        self.scope_cache = scope_cache
+        self.make_key: MakeKey = make_key or _make_key
+        self.data: collections.OrderedDict[Any, _Entry] = collections.OrderedDict()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        functools.update_wrapper(self, user_function, updated=())
+        with scope_cache.lock:
+            scope_cache.policy_caches.append(self)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        key = self.make_key(args, kwargs)
+        if (entry := self._lookup(key)) is not None:
+            return entry.value
+        value = self.user_function(*args, **kwargs)
+        self._store(key, value)
+        return value
+
+    def _lookup(self, key: Any) -> _Entry | None:
+        with self.scope_cache.lock:
+            if (entry := self.data.get(key)) is not None:
+                if entry.expires > time.monotonic():
+                    self.hits += 1
+                    entry.tick = self.scope_cache._next_tick()
+                    self.data.move_to_end(key)
+                    return entry
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def _store(self, key: Any, value: Any) -> None:
+        scope_cache = self.scope_cache
+        size = 0
+        if scope_cache.max_bytes is not None:
+            size = estimate_size(key) + estimate_size(value)
+        expires = float("inf")
+        if scope_cache.ttl is not None:
+            expires = time.monotonic() + scope_cache.ttl
+        with scope_cache.lock:
+            if key in self.data:
+                self._remove(key)
+            self.data[key] = _Entry(value, size, expires, scope_cache._next_tick())
+            scope_cache.total_bytes += size
+
+            if scope_cache.max_entries is not None:
+                while len(self.data) > scope_cache.max_entries:
+                    self.evict()
+            if scope_cache.max_bytes is not None:
+                scope_cache._enforce_max_bytes()
+
+    def _store_future(self, key: Any, future: asyncio.Future) -> None:
+        """Store a task or future, sized by its result once it's done"""
+        self._store(key, future)
+        if self.scope_cache.max_bytes is not None:
+            future.add_done_callback(functools.partial(self._resize, key))
+
+    def _resize(self, key: Any, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            # it's discarded by whoever awaits it
+            return
+        size = estimate_size(key) + estimate_size(future.result())
+        scope_cache = self.scope_cache
+        with scope_cache.lock:
+            if (entry := self.data.get(key)) is None or entry.value is not future:
+                return
+            scope_cache.total_bytes += size - entry.size
+            entry.size = size
+            scope_cache._enforce_max_bytes()
+
+    def _remove(self, key: Any) -> None:
+        self.scope_cache.total_bytes -= self.data.pop(key).size
+
+    def _discard(self, key: Any, value: Any) -> None:
+        """Remove `key`, but only if it's still cached as `value`"""
+        with self.scope_cache.lock:
+            if (entry := self.data.get(key)) is not None and entry.value is value:
+                self._remove(key)
+
+    def evict(self) -> None:
+        """Evict the least recently used entry"""
+        with self.scope_cache.lock:
+            self._remove(next(iter(self.data)))
+            self.evictions += 1
+
+    def bytes_cached(self) -> int:
+        """The (approximate) size of the entries, if the scope has max_bytes"""
+        with self.scope_cache.lock:
+            return sum(entry.size for entry in self.data.values())
+
+    def oldest_tick(self) -> int | None:
+        with self.scope_cache.lock:
+            if not self.data:
+                return None
+            return next(iter(self.data.values())).tick
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(
+            self.hits,
+            self.misses,
+            self.scope_cache.max_entries,
+            len(self.data),
+            self.evictions,
+            self.expirations,
+        )
+
+    def cache_clear(self) -> None:
+        with self.scope_cache.lock:
+            for key in list(self.data):
+                self._remove(key)
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+
+class BackendCache(PolicyCache):
+    """A memoized function that's also backed by the ScopeCache's backend
+
+    Results are cached in memory as usual, but a miss in memory is looked up
+    in the backend before calling the function, and new results are written
+    to the backend.
+    """
+
+    def __init__(
+        self,
+        user_function: Callable,
+        scope_cache: "ScopeCache",
+        make_key: MakeKey | None = None,
+    ) -> None:
+        super().__init__(user_function, scope_cache, make_key)
+        assert scope_cache.backend is not None
+        self.backend: Backend = scope_cache.backend
+        self.backend_hits = 0
+
+    def __call__(self, *args, **kwargs) -> Any:
+        key = self.make_key(args, kwargs)
+        if (entry := self._lookup(key)) is not None:
+            return entry.value
+
+        backend_key = self._backend_key(key, args, kwargs)
+        try:
+            value = self._backend_get(backend_key)
+        except KeyError:
+            value = self.user_function(*args, **kwargs)
+            self._backend_set(backend_key, value)
+        self._store(key, value)
+        return value
+
+    def _backend_key(self, key: Hashable, args: tuple, kwargs: dict) -> bytes | None:
+        if self.make_key is _make_key:
+            return stable_key(self.user_function, args, kwargs)
+        # A `key=` function decides which calls are equivalent, and its key is
+        # usually much smaller than the arguments (e.g. an array's digest)
+        return stable_cache_key(self.user_function, key)
+
+    def _backend_get(self, backend_key: bytes | None) -> Any:
+        if backend_key is None:
+            raise KeyError(backend_key)
+        value = self.backend[backend_key]
+        self.backend_hits += 1
+        return value
+
+    def _backend_set(self, backend_key: bytes | None, value: Any) -> None:
+        if backend_key is None:
+            return
+        try:
+            self.backend[backend_key] = value
+        except (pickle.PicklingError, TypeError, AttributeError):
+            logger.debug("can't store unpicklable result of %s", self)
+
+
+class AsyncPolicyCache(PolicyCache):
+    """A memoized coroutine function
+
+    The cache holds an `asyncio.Task` for each set of arguments, so the
+    *result* is cached rather than a coroutine that can only be awaited once,
+    and concurrent callers with the same arguments all await the same task
+    instead of each starting their own. Tasks that fail are dropped from the
+    cache so the next call tries again.
+    """
+
+    async def __call__(self, *args, **kwargs) -> Any:
+        key = self.make_key(args, kwargs)
+        if (entry := self._lookup(key)) is not None:
+            task = entry.value
+        else:
+            task = asyncio.ensure_future(self._call(key, args, kwargs))
+            self._store_future(key, task)
+
+        try:
+            # shield so that one caller being cancelled doesn't cancel the
+            # task for everyone else awaiting it
+            return await asyncio.shield(task)
+        except BaseException:
+            if task.done():
+                self._discard(key, task)
+            raise
+
+    def _call(self, key: Hashable, args: tuple, kwargs: dict) -> Coroutine:
+        return self.user_function(*args, **kwargs)
+
+
+class AsyncBackendCache(AsyncPolicyCache, BackendCache):
+    """A memoized coroutine function that's also backed by the backend
+
+    Like AsyncPolicyCache the cache holds a task for each set of arguments,
+    and the task looks the result up in the backend before awaiting the
+    function, so concurrent callers share the backend lookup too.
+    """
+
+    def _call(self, key: Hashable, args: tuple, kwargs: dict) -> Coroutine:
+        return self._load(self._backend_key(key, args, kwargs), args, kwargs)
+
+    async def _load(self, backend_key: bytes | None, args: tuple, kwargs: dict) -> Any:
+        try:
+            return self._backend_get(backend_key)
+        except KeyError:
+            pass
+        value = await self.user_function(*args, **kwargs)
+        self._backend_set(backend_key, value)
+        return value
+
+
+class BatchLoader(PolicyCache):
+    """The cache for a function decorated with @batch_load_with_scope_cache
+
+    Each key's value is cached individually, but missing keys are loaded
+    together with a single call to the user's "load many" function. For
+    coroutine functions, every key requested in the same event loop tick
+    goes into the same call.
+    """
+
+    def __init__(self, user_function: Callable, scope_cache: "ScopeCache") -> None:
+        super().__init__(user_function, scope_cache)
+        # How many times the user's load many function has been called
+        self.batches = 0
+        self._pending: dict[Any, asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def load_many(self, keys: Iterable) -> list:
+        values = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            if (entry := self._lookup(key)) is not None:
+                values[key] = entry.value
+            else:
+                missing.append(key)
+
+        if missing:
+            self.batches += 1
+            loaded = self.user_function(missing)
+            for key in missing:
+                if key in loaded:
+                    values[key] = loaded[key]
+                    self._store(key, loaded[key])
+
+        return [values[key] for key in keys]
+
+    async def load_async(self, key: Any) -> Any:
+        if (entry := self._lookup(key)) is not None:
+            future = entry.value
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._store_future(key, future)
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            self._pending[key] = future
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, {}
+        self.batches += 1
+        task = asyncio.ensure_future(self._load_batch(pending))
+        # keep a reference to the task so it isn't garbage collected
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load_batch(self, pending: dict[Any, asyncio.Future]) -> None:
+        try:
+            loaded = await self.user_function(list(pending))
+        except BaseException as exc:
+            for key, future in pending.items():
+                self._discard(key, future)
+                if not future.done():
+                    future.set_exception(exc)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return
+
+        for key, future in pending.items():
+            if future.done():
+                continue
+            if key in loaded:
+                future.set_result(loaded[key])
+            else:
+                self._discard(key, future)
+                future.set_exception(KeyError(key))
+
+
+class _SingleFlight:
+    """Make concurrent calls (from different threads) with the same arguments
+    share a single call to `user_function`
+
+    It sits underneath the cache, so it's only reached on a cache miss.
+    """
+
+    def __init__(self, user_function: Callable, make_key: MakeKey) -> None:
+        self.user_function = user_function
+        self.make_key = make_key
+        self.lock = threading.Lock()
+        # key: the Future that waiting threads wait on, which is only
+        # created once a second thread turns up wanting the same key
+        self.in_flight: dict[Any, concurrent.futures.Future | None] = {}
+        # How many calls waited for another thread's call instead, and how
+        # many calls raised an exception
+        self.coalesced = 0
+        self.failures = 0
+        functools.update_wrapper(self, user_function, updated=())
+
+    def __call__(self, *args, **kwargs) -> Any:
+        key = self.make_key(args, kwargs)
+        with self.lock:
+            if key in self.in_flight:
+                if (future := self.in_flight[key]) is None:
+                    future = self.in_flight[key] = concurrent.futures.Future()
+                self.coalesced += 1
+            else:
+                self.in_flight[key] = future = None
+
+        if future is not None:
+            return future.result()
+
+        try:
+            result = self.user_function(*args, **kwargs)
+        except BaseException as exc:
+            with self.lock:
+                future = self.in_flight.pop(key)
+                self.failures += 1
+            if future is not None:
+                future.set_exception(exc)
+            raise
+        with self.lock:
+            future = self.in_flight.pop(key)
+        if future is not None:
+            future.set_result(result)
+        return result
+
+
+class _TimedMisses:
+    """Sits underneath the cache and records every miss in FunctionStats"""
+
+    def __init__(self, user_function: Callable, stats: FunctionStats) -> None:
+        self.user_function = user_function
+        self.stats = stats
+        functools.update_wrapper(self, user_function, updated=())
+
+    def __call__(self, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        result = self.user_function(*args, **kwargs)
+        self.stats.record_miss(time.perf_counter() - start, estimate_size(result))
+        return result
+
+
+class _AsyncTimedMisses(_TimedMisses):
+    async def __call__(self, *args, **kwargs) -> Any:
+        start = time.perf_counter()
+        result = await self.user_function(*args, **kwargs)
+        self.stats.record_miss(time.perf_counter() - start, estimate_size(result))
+        return result
+
+
+class _CountedCalls:
+    """Sits on top of the cache and records every call in FunctionStats
+
+    Everything else is passed through to the memoized function.
+    """
+
+    def __init__(
+        self,
+        memoized: functools._lru_cache_wrapper | PolicyCache,
+        stats: FunctionStats,
+        make_key: MakeKey,
+    ) -> None:
+        self.memoized = memoized
+        self.stats = stats
+        self.make_key = make_key
+
+    def __call__(self, *args, **kwargs) -> Any:
+        self.stats.record_call(self.make_key(args, kwargs))
+        return self.memoized(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.memoized, name)
+
+
+# What a ScopeCache holds for each memoized function
+Memoized = functools._lru_cache_wrapper | PolicyCache | _CountedCalls
+ScopeCacheType = dict[Callable, Memoized]
+
+
+def _unwrap(memoized: Memoized) -> functools._lru_cache_wrapper | PolicyCache:
+    """Return the cache underneath any instrumentation"""
+    if isinstance(memoized, _CountedCalls):
+        return memoized.memoized
+    return memoized
 
 
 class ScopeCache(ScopeCacheType):
@@ -55,17 +611,214 @@ class ScopeCache(ScopeCacheType):
     function
 
     Internally, this is a dictionary mapping the original function to the
-    lru_cache decorated version of the function.
+    lru_cache decorated version of the function (or a PolicyCache if the
+    scope has a byte budget or ttl). It's a plain dict subclass rather than
+    a UserDict so that looking up the memoized function stays in C.
     """
-    def cache_info(self) -> dict:
-        return {key: value.cache_info() for key, value in self.data.items()}
+
+    def __init__(
+        self,
+        *,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+        backend: Backend | None = None,
+        instrument: bool | ReportHook = False,
+    ) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.backend = backend
+        # See scoped_cache.instrumentation
+        self.stats: dict[Callable, FunctionStats] | None = None
+        self.report_hook: ReportHook | None = None
+        if instrument:
+            self.stats = {}
+            if callable(instrument):
+                self.report_hook = instrument
+        self.total_bytes = 0
+        self._tick = 0
+        # Guards the entries of every PolicyCache in this scope, and
+        # total_bytes, which are shared by every thread using the scope. It's
+        # reentrant because storing an entry can evict entries.
+        self.lock = threading.RLock()
+        # Every PolicyCache in this scope, for evicting across functions
+        self.policy_caches: list[PolicyCache] = []
+        # How many `with` blocks (in any thread or task) this is active in
+        self._entered = 0
+
+    def __enter__(self) -> "ScopeCache":
+        """Make this the active cache for memoized functions called in the block
+
+        The same ScopeCache can be entered by several threads or tasks at
+        once: the tokens to restore the previous active cache are kept in a
+        context variable, so each context only resets its own.
+        """
+        token = _active_scope_cache.set(self)
+        _active_scope_cache_tokens.set(_active_scope_cache_tokens.get() + (token,))
+        with self.lock:
+            self._entered += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        *tokens, token = _active_scope_cache_tokens.get()
+        _active_scope_cache_tokens.set(tuple(tokens))
+        _active_scope_cache.reset(token)
+        with self.lock:
+            self._entered -= 1
+            last = self._entered == 0
+        if self.stats is not None and last:
+            self.emit_report()
+
+    def memoize(
+        self, user_function: Callable, key: Callable[..., Hashable] | None = None
+    ) -> Memoized:
+        """Return the memoized version of `user_function` for this scope
+
+        `key`, if given, is called with the arguments to make the cache key.
+        """
+        is_async = inspect.iscoroutinefunction(user_function)
+        make_key = _make_key if key is None else _user_make_key(key)
+        if self.stats is None:
+            return self._memoize(user_function, is_async, make_key)
+
+        stats = self.stats[user_function] = FunctionStats(user_function.__qualname__)
+        timed: _TimedMisses
+        if is_async:
+            timed = _AsyncTimedMisses(user_function, stats)
+        else:
+            timed = _TimedMisses(user_function, stats)
+        return _CountedCalls(self._memoize(timed, is_async, make_key), stats, make_key)
+
+    def _memoize(
+        self, user_function: Callable, is_async: bool, make_key: MakeKey
+    ) -> functools._lru_cache_wrapper | PolicyCache:
+        if is_async:
+            if self.backend is not None:
+                return AsyncBackendCache(user_function, self, make_key)
+            return AsyncPolicyCache(user_function, self, make_key)
+        single_flight = _SingleFlight(user_function, make_key)
+        if self.backend is not None:
+            return BackendCache(single_flight, self, make_key)
+        if (
+            self.max_bytes is not None
+            or self.ttl is not None
+            # lru_cache can only key on the arguments themselves
+            or make_key is not _make_key
+        ):
+            return PolicyCache(single_flight, self, make_key)
+        if self.max_entries is not None:
+            return functools.lru_cache(maxsize=self.max_entries)(single_flight)
+        return functools.cache(single_flight)
+
+    def report(self, sort_by: str = "time_saved_seconds") -> list[FunctionReport]:
+        """Return a FunctionReport for every memoized function, largest first
+
+        Only available for a ScopeCache created with `instrument=`.
+        """
+        if self.stats is None:
+            raise ValueError("this ScopeCache isn't instrumented")
+        reports = [
+            stats.report(self._bytes_cached(user_function, stats))
+            for user_function, stats in list(self.stats.items())
+        ]
+        return sort_reports(reports, sort_by)
+
+    def _bytes_cached(self, user_function: Callable, stats: FunctionStats) -> int:
+        if (value := self.get(user_function)) is None:
+            return 0
+        memoized = _unwrap(value)
+        if isinstance(memoized, PolicyCache) and self.max_bytes is not None:
+            # entries are only sized when the scope has a byte budget
+            return memoized.bytes_cached()
+        return memoized.cache_info().currsize * stats.mean_result_bytes()
+
+    def emit_report(self) -> None:
+        """Pass the report to the report hook, or log it if there isn't one"""
+        reports = self.report()
+        if self.report_hook is not None:
+            self.report_hook(reports)
+        else:
+            logger.info("scope cache report:\n%s", format_report(reports))
+
+    def _next_tick(self) -> int:
+        self._tick += 1
+        return self._tick
+
+    def _enforce_max_bytes(self) -> None:
+        assert self.max_bytes is not None
+        with self.lock:
+            while self.total_bytes > self.max_bytes:
+                # Evict from whichever function has the least recently used
+                # entry
+                oldest = None
+                for memoized in self.policy_caches:
+                    if (tick := memoized.oldest_tick()) is not None and (
+                        oldest is None or tick < oldest[0]
+                    ):
+                        oldest = (tick, memoized)
+                if oldest is None:
+                    break
+                oldest[1].evict()
+
+    @property
+    def data(self) -> dict:
+        """For compatibility with when this was a UserDict"""
+        return self
+
+    def cache_info(self) -> dict[Callable, CacheInfo]:
+        result = {}
+        for key, value in self.items():
+            memoized = _unwrap(value)
+            if isinstance(memoized, PolicyCache):
+                result[key] = memoized.cache_info()
+                continue
+            # functools.lru_cache doesn't count evictions, but every miss
+            # that didn't fail and wasn't coalesced with another thread's
+            # call adds an entry, so the ones that aren't there any more
+            # were evicted.
+            info = memoized.cache_info()
+            evictions = 0
+            if info.maxsize is not None:
+                single_flight = memoized.__wrapped__
+                assert isinstance(single_flight, _SingleFlight)
+                evictions = (
+                    info.misses
+                    - info.currsize
+                    - single_flight.coalesced
+                    - single_flight.failures
+                )
+            result[key] = CacheInfo(*info, evictions, 0)
+        return result
 
     def cache_clear(self) -> None:
-        for value in self.data.values():
+        for value in list(self.values()):
             value.cache_clear()
+            single_flight = getattr(value, "__wrapped__", None)
+            if isinstance(single_flight, _SingleFlight):
+                single_flight.coalesced = single_flight.failures = 0
+
 
+_active_scope_cache: contextvars.ContextVar[ScopeCache | None] = (
+    contextvars.ContextVar("active_scope_cache", default=None)
+)
+# The tokens to reset _active_scope_cache with, innermost `with` block last
+_active_scope_cache_tokens: contextvars.ContextVar[tuple[contextvars.Token, ...]] = (
+    contextvars.ContextVar("active_scope_cache_tokens", default=())
+)
 
-def memoize_with_scope_cache(user_function: Callable) -> Callable:
+
+def active_scope_cache() -> ScopeCache | None:
+    """Return the ScopeCache made active by `with ScopeCache():`, if any"""
+    return _active_scope_cache.get()
+
+
+def memoize_with_scope_cache(
+    user_function: Callable | None = None,
+    *,
+    key: Callable[..., Hashable] | None = None,
+) -> Callable:
     """
     Selectively memoize the function using a ScopeCache
 
@@ -76,29 +829,156 @@ def memoize_with_scope_cache(user_function: Callable) -> Callable:
     Subsequent calls with the same ScopeCache *and* arguments will
     return the cached result.
 
+    Coroutine functions can be decorated too: the result is cached
+    (not the coroutine), and concurrent calls with the same arguments
+    share a single in-flight call. The same goes for concurrent calls
+    from different threads.
+
+    Without the keyword argument, the active ScopeCache (see
+    `ScopeCache.__enter__`) is used, if there is one.
+
     NOTE: because the `scope_cache=` keyword argument is removed
     from the function call, recursive calls to other
-    memoized functions will not have the cache passed to them.
+    memoized functions will not have the cache passed to them. Use
+    `with ScopeCache():` to cover the whole call tree instead.
+
+    Like functools.cache, the arguments have to be hashable. For functions
+    that take lists, dicts, arrays and so on, use
+    `@memoize_with_scope_cache(key=...)` with a function that makes a
+    hashable key from the arguments, e.g. `structural_key` or `content_key`
+    from `scoped_cache.keys`.
     """
-    @functools.wraps(user_function)
-    def wrapper(*args, **kwargs) -> Any:
-        scope_cache = kwargs.pop(KWARG_NAME, None)
-        cache_decorator: Final = functools.cache
+    if user_function is None:
+        return functools.partial(memoize_with_scope_cache, key=key)
+
+    def get_memoized_user_function(scope_cache: ScopeCache) -> Callable:
+        # Create the memoized function and store it in the scope cache
+        memoized_user_function = scope_cache[user_function] = scope_cache.memoize(
+            user_function, key
+        )
+        logger.debug("created %s from %s", memoized_user_function, user_function)
+        return memoized_user_function
+
+    # The wrappers below are the hot path for every call, so they avoid
+    # anything that isn't needed for a cache hit: the `scope_cache` keyword
+    # is bound by the signature instead of popped from kwargs, the memoized
+    # function is looked up with a plain dict subscript, and empty kwargs
+    # aren't passed on so the cache key is built from just the args.
+    if inspect.iscoroutinefunction(user_function):
+
+        @functools.wraps(user_function)
+        async def async_wrapper(*args, scope_cache=None, **kwargs) -> Any:
+            if scope_cache is None:
+                scope_cache = _active_scope_cache.get()
+                if scope_cache is None:
+                    if LOG_CALLS:
+                        logger.debug("calling the original `user_function`")
+                    return await user_function(*args, **kwargs)
 
+            try:
+                memoized_user_function = scope_cache[user_function]
+            except KeyError:
+                memoized_user_function = get_memoized_user_function(scope_cache)
+
+            if LOG_CALLS:
+                logger.debug("calling the memoized function %s", memoized_user_function)
+            return await memoized_user_function(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(user_function)
+    def wrapper(*args, scope_cache=None, **kwargs) -> Any:
         if scope_cache is None:
-            # If no cache is provided we just use the vanilla function
-            logger.debug("calling the original `user_function`")
-            return user_function(*args, **kwargs)
+            scope_cache = _active_scope_cache.get()
+            if scope_cache is None:
+                # If no cache is provided we just use the vanilla function
+                if LOG_CALLS:
+                    logger.debug("calling the original `user_function`")
+                return user_function(*args, **kwargs)
 
         # Fetch (maybe create) the memoized function from the scope cache
-        if (memoized_user_function := scope_cache.get(user_function)) is None:
-            memoized_user_function = scope_cache[user_function] = (
-                cache_decorator(user_function)
-            )
-            logger.debug("created %s from %s", memoized_user_function, user_function)
+        try:
+            memoized_user_function = scope_cache[user_function]
+        except KeyError:
+            memoized_user_function = get_memoized_user_function(scope_cache)
 
         # call the memoized function
-        logger.debug("calling the memoized function %s", memoized_user_function)
-        return memoized_user_function(*args, **kwargs)
+        if LOG_CALLS:
+            logger.debug("calling the memoized function %s", memoized_user_function)
+        if kwargs:
+            return memoized_user_function(*args, **kwargs)
+        return memoized_user_function(*args)
 
     return wrapper
+
+
+def batch_load_with_scope_cache(load_many: Callable) -> Callable:
+    """
+    Turn a "load many keys" function into a batching, scope cached loader
+
+    `load_many` takes a list of keys and returns a mapping of key to value.
+    The decorated function takes a single key:
+
+    >>> @batch_load_with_scope_cache
+    >>> async def load_users(user_ids: list[int]) -> dict[int, User]:
+    >>>     ...
+    >>>
+    >>> with ScopeCache():
+    >>>     users = await asyncio.gather(*(load_users(i) for i in user_ids))
+
+    Every value is cached in the ScopeCache, and every key that isn't cached
+    yet and is requested in the same event loop tick is loaded with one call
+    to `load_many`.
+
+    A normal (non async) function can't wait to see what else gets requested,
+    so for those use `.load_many(keys)` to load a lot of keys at once. Any
+    later single key calls will then come from the cache.
+
+    Keys missing from the mapping returned by `load_many` raise KeyError.
+    Without a ScopeCache, every call goes straight to `load_many`.
+    """
+    def get_loader(scope_cache: ScopeCache | None) -> BatchLoader | None:
+        if scope_cache is None:
+            scope_cache = _active_scope_cache.get()
+        if scope_cache is None:
+            return None
+        loader = scope_cache.get(load_many)
+        if not isinstance(loader, BatchLoader):
+            loader = scope_cache[load_many] = BatchLoader(load_many, scope_cache)
+        return loader
+
+    if inspect.iscoroutinefunction(load_many):
+
+        @functools.wraps(load_many)
+        async def async_load(
+            key: Any, *, scope_cache: ScopeCache | None = None
+        ) -> Any:
+            if (loader := get_loader(scope_cache)) is None:
+                return (await load_many([key]))[key]
+            return await loader.load_async(key)
+
+        async def async_load_many(
+            keys: Iterable, *, scope_cache: ScopeCache | None = None
+        ) -> list:
+            return await asyncio.gather(
+                *(async_load(key, scope_cache=scope_cache) for key in keys)
+            )
+
+        async_load.load_many = async_load_many  # type: ignore[attr-defined]
+        return async_load
+
+    @functools.wraps(load_many)
+    def load(key: Any, *, scope_cache: ScopeCache | None = None) -> Any:
+        return load_many_keys([key], scope_cache=scope_cache)[0]
+
+    def load_many_keys(
+        keys: Iterable, *, scope_cache: ScopeCache | None = None
+    ) -> list:
+        keys = list(keys)
+        if (loader := get_loader(scope_cache)) is None:
+            loaded = load_many(keys)
+            return [loaded[key] for key in keys]
+        return loader.load_many(keys)
+
+    load.load_many = load_many_keys  # type: ignore[attr-defined]
+    return load
@@ -0,0 +1,277 @@
+"""
+Storage backends that let a ScopeCache outlive (or be shared beyond) a process
+
+A ScopeCache normally only lives in one process's memory. Given a backend,
+results are also written to (and looked up in) the backend, so:
+
+ - worker processes in a ProcessPoolExecutor can share each other's
+   results (pass the backend to the workers, it pickles by reference)
+ - the next run of the same job can warm start from the last one
+
+>>> backend = SQLiteBackend("job-cache.sqlite3")
+>>> with ScopeCache(backend=backend):
+>>>     ...
+
+Entries are keyed by a stable hash of the function's qualified name and its
+(pickled) arguments, or the key made by its `key=` function if it has one,
+and values are pickled, so both arguments (or keys) and results need to be
+picklable for the backend to be used.
+
+A SharedMemoryBackend can be snapshotted to disk and warm started from it:
+
+>>> SQLiteBackend("snapshot.sqlite3").update(shared_memory_backend.items())
+>>> shared_memory_backend.update(SQLiteBackend("snapshot.sqlite3").items())
+"""
+
+import os
+import zlib
+import struct
+import pickle
+import sqlite3
+import hashlib
+import pathlib
+import threading
+from multiprocessing import shared_memory
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+KEY_SIZE = 16
+
+
+def stable_key(user_function: Callable, args: tuple, kwargs: dict) -> bytes | None:
+    """Return a key for the call that's the same in every process and run
+
+    Returns None if the arguments can't be pickled.
+    """
+    return _digest(
+        (
+            user_function.__module__,
+            user_function.__qualname__,
+            args,
+            sorted(kwargs.items()),
+        )
+    )
+
+
+def stable_cache_key(user_function: Callable, key: Hashable) -> bytes | None:
+    """Like `stable_key`, but from the key made by the function's `key=`
+
+    Returns None if the key can't be pickled.
+    """
+    return _digest((user_function.__module__, user_function.__qualname__, "key", key))
+
+
+def _digest(obj: Any) -> bytes | None:
+    try:
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+    return hashlib.blake2b(data, digest_size=KEY_SIZE).digest()
+
+
+class Backend:
+    """Base class for ScopeCache storage backends
+
+    A backend is a mapping of `stable_key()` bytes to (picklable) values.
+    `__getitem__` raises KeyError for missing keys.
+    """
+
+    def __getitem__(self, key: bytes) -> Any:
+        raise NotImplementedError
+
+    def __setitem__(self, key: bytes, value: Any) -> None:
+        raise NotImplementedError
+
+    def items(self) -> Iterator[tuple[bytes, Any]]:
+        raise NotImplementedError
+
+    def update(self, items: Iterable[tuple[bytes, Any]]) -> None:
+        for key, value in items:
+            self[key] = value
+
+
+class SQLiteBackend(Backend):
+    """Stores results in an SQLite database file
+
+    The database is in WAL mode so that several processes can read and write
+    it at once. Each thread (and process) gets its own connection.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self._setup(path)
+
+    def _setup(self, path: str | os.PathLike) -> None:
+        self.path = pathlib.Path(path)
+        self._local = threading.local()
+
+    def __getstate__(self) -> dict:
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self._setup(state["path"])
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        # A connection can't be shared with a forked child process
+        if getattr(local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS scoped_cache "
+                "(key BLOB PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID"
+            )
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def __getitem__(self, key: bytes) -> Any:
+        row = (
+            self._connection()
+            .execute("SELECT value FROM scoped_cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def __setitem__(self, key: bytes, value: Any) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO scoped_cache (key, value) VALUES (?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+
+    def items(self) -> Iterator[tuple[bytes, Any]]:
+        for key, value in self._connection().execute(
+            "SELECT key, value FROM scoped_cache"
+        ):
+            yield key, pickle.loads(value)
+
+    def update(self, items: Iterable[tuple[bytes, Any]]) -> None:
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR REPLACE INTO scoped_cache (key, value) VALUES (?, ?)",
+                (
+                    (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+                    for key, value in items
+                ),
+            )
+
+
+# Each slot is a header of crc32, key and value length followed by the value
+_SLOT_HEADER = struct.Struct(f"<I{KEY_SIZE}sI")
+_EMPTY_KEY = bytes(KEY_SIZE)
+
+
+class SharedMemoryBackend(Backend):
+    """Stores results in a `multiprocessing.shared_memory` hash table
+
+    The table is `slots` fixed size slots of `slot_size` bytes. Values that
+    don't fit in a slot aren't stored, and when all of the slots a key can
+    go in are taken, the first one is overwritten.
+
+    There's no locking between processes. Instead every slot has a checksum
+    and a slot that doesn't match its checksum (because another process was
+    half way through writing it) is treated as a cache miss.
+
+    Create it in the parent process and pass it to the workers, they attach
+    to the same block of shared memory by name. The creator should call
+    `unlink()` when the job is done.
+    """
+
+    max_probes = 8
+
+    def __init__(
+        self,
+        name: str | None = None,
+        slots: int = 65_536,
+        slot_size: int = 1024,
+        create: bool = True,
+    ) -> None:
+        self._setup(name, slots, slot_size, create)
+
+    def _setup(
+        self, name: str | None, slots: int, slot_size: int, create: bool
+    ) -> None:
+        self.slots = slots
+        self.slot_size = slot_size
+        if create:
+            self.shared_memory = shared_memory.SharedMemory(
+                name=name, create=True, size=slots * slot_size
+            )
+        else:
+            # Don't let this process's resource tracker unlink the memory
+            # out from under the creator when this process exits
+            self.shared_memory = shared_memory.SharedMemory(name=name, track=False)
+        self.name = self.shared_memory.name
+
+    def __getstate__(self) -> dict:
+        return {"name": self.name, "slots": self.slots, "slot_size": self.slot_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self._setup(state["name"], state["slots"], state["slot_size"], create=False)
+
+    def _buf(self) -> memoryview:
+        # Only None once the shared memory is closed
+        buf = self.shared_memory.buf
+        assert buf is not None
+        return buf
+
+    def _slot_offsets(self, key: bytes) -> Iterator[int]:
+        start = int.from_bytes(key[:8], "little")
+        for probe in range(self.max_probes):
+            yield ((start + probe) % self.slots) * self.slot_size
+
+    def _read(self, offset: int) -> tuple[bytes, bytes] | None:
+        """Return the key and value of the slot, None if it's empty or torn"""
+        buf = self._buf()
+        crc, key, length = _SLOT_HEADER.unpack_from(buf, offset)
+        if key == _EMPTY_KEY or length > self.slot_size - _SLOT_HEADER.size:
+            return None
+        start = offset + _SLOT_HEADER.size
+        value = bytes(buf[start : start + length])
+        if zlib.crc32(value, zlib.crc32(key)) != crc:
+            return None
+        return key, value
+
+    def __getitem__(self, key: bytes) -> Any:
+        for offset in self._slot_offsets(key):
+            if (slot := self._read(offset)) is None:
+                continue
+            if slot[0] == key:
+                return pickle.loads(slot[1])
+        raise KeyError(key)
+
+    def __setitem__(self, key: bytes, value: Any) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.slot_size - _SLOT_HEADER.size:
+            return
+
+        offsets = list(self._slot_offsets(key))
+        target = offsets[0]
+        for offset in offsets:
+            slot = self._read(offset)
+            if slot is None or slot[0] == key:
+                target = offset
+                break
+
+        buf = self._buf()
+        # Invalidate the slot before writing it, then write the checksum last
+        _SLOT_HEADER.pack_into(buf, target, 0, _EMPTY_KEY, 0)
+        start = target + _SLOT_HEADER.size
+        buf[start : start + len(data)] = data
+        _SLOT_HEADER.pack_into(
+            buf, target, zlib.crc32(data, zlib.crc32(key)), key, len(data)
+        )
+
+    def items(self) -> Iterator[tuple[bytes, Any]]:
+        for slot in range(self.slots):
+            if (found := self._read(slot * self.slot_size)) is not None:
+                yield found[0], pickle.loads(found[1])
+
+    def close(self) -> None:
+        self.shared_memory.close()
+
+    def unlink(self) -> None:
+        self.shared_memory.unlink()
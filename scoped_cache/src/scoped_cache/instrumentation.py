@@ -0,0 +1,153 @@
+"""
+Optional per-function statistics for a ScopeCache
+
+Turned on with `ScopeCache(instrument=True)`, which logs a report when the
+`with ScopeCache(...):` block ends, or `ScopeCache(instrument=hook)` to pass
+the report to `hook` instead (e.g. to export it to a metrics system). The
+report is also available at any time from `ScopeCache.report()`.
+
+Nothing is recorded (and nothing costs anything) unless it's turned on.
+"""
+
+import time
+import heapq
+import operator
+import collections
+from typing import Any, Callable, NamedTuple
+
+# How many of the most requested keys to include in a report
+HOTTEST_KEYS = 5
+# How many keys are counted to find them (see _HeavyHitters)
+TRACKED_KEYS = 10 * HOTTEST_KEYS
+
+
+class FunctionReport(NamedTuple):
+    function: str
+    calls: int
+    hits: int
+    misses: int
+    hit_rate: float
+    mean_miss_seconds: float
+    # hits * mean miss latency
+    time_saved_seconds: float
+    # approximate size of the results cached now
+    bytes_cached: int
+    # approximate counts, see _HeavyHitters
+    hottest_keys: list[tuple[str, int]]
+    # The hit rate in each `FunctionStats.interval` seconds of the scope
+    hit_rate_timeline: list[float]
+
+
+class _HeavyHitters:
+    """Counts of the most frequent keys, in bounded memory
+
+    This is the Space-Saving algorithm: at most `capacity` keys are counted,
+    and a key that isn't counted yet when there's no room takes over the
+    least counted key's slot and count. Every key making up more than
+    1/capacity of the calls is counted, over-counted by at most the smallest
+    count.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.counts: dict[Any, int] = {}
+
+    def add(self, key: Any) -> None:
+        counts = self.counts
+        if key in counts:
+            counts[key] += 1
+        elif len(counts) < self.capacity:
+            counts[key] = 1
+        else:
+            least = min(counts, key=counts.__getitem__)
+            counts[key] = counts.pop(least) + 1
+
+    def most_common(self, n: int) -> list[tuple[Any, int]]:
+        return heapq.nlargest(n, self.counts.items(), key=operator.itemgetter(1))
+
+
+class FunctionStats:
+    """What happened to one memoized function in one ScopeCache"""
+
+    def __init__(self, name: str, interval: float = 1.0) -> None:
+        self.name = name
+        self.interval = interval
+        self.start = time.monotonic()
+        self.calls = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        # The total size of every result computed, for the mean result size
+        self.bytes_computed = 0
+        self.key_counts = _HeavyHitters(TRACKED_KEYS)
+        # interval number: [calls, misses]
+        self.timeline: collections.defaultdict[int, list[int]] = (
+            collections.defaultdict(lambda: [0, 0])
+        )
+
+    def _bucket(self) -> list[int]:
+        return self.timeline[int((time.monotonic() - self.start) / self.interval)]
+
+    def record_call(self, key: Any) -> None:
+        self.calls += 1
+        self.key_counts.add(key)
+        self._bucket()[0] += 1
+
+    def record_miss(self, seconds: float, size: int) -> None:
+        self.misses += 1
+        self.miss_seconds += seconds
+        self.bytes_computed += size
+        self._bucket()[1] += 1
+
+    def mean_result_bytes(self) -> int:
+        return self.bytes_computed // self.misses if self.misses else 0
+
+    def report(self, bytes_cached: int) -> FunctionReport:
+        hits = max(0, self.calls - self.misses)
+        mean_miss_seconds = self.miss_seconds / self.misses if self.misses else 0.0
+        timeline = []
+        if self.timeline:
+            for bucket in range(max(self.timeline) + 1):
+                calls, misses = self.timeline.get(bucket, (0, 0))
+                timeline.append((calls - misses) / calls if calls else 0.0)
+        return FunctionReport(
+            function=self.name,
+            calls=self.calls,
+            hits=hits,
+            misses=self.misses,
+            hit_rate=hits / self.calls if self.calls else 0.0,
+            mean_miss_seconds=mean_miss_seconds,
+            time_saved_seconds=hits * mean_miss_seconds,
+            bytes_cached=bytes_cached,
+            hottest_keys=[
+                (repr(key), count)
+                for key, count in self.key_counts.most_common(HOTTEST_KEYS)
+            ],
+            hit_rate_timeline=timeline,
+        )
+
+
+def sort_reports(
+    reports: list[FunctionReport], sort_by: str = "time_saved_seconds"
+) -> list[FunctionReport]:
+    """Sort reports by one of the FunctionReport fields, largest first"""
+    return sorted(reports, key=lambda report: getattr(report, sort_by), reverse=True)
+
+
+def format_report(reports: list[FunctionReport]) -> str:
+    """Format reports as a table"""
+    lines = [
+        f"{'function':<40} {'calls':>10} {'hit rate':>9} "
+        f"{'mean miss':>11} {'time saved':>11} {'bytes':>12}"
+    ]
+    for report in reports:
+        lines.append(
+            f"{report.function:<40} {report.calls:>10,} {report.hit_rate:>9.1%} "
+            f"{report.mean_miss_seconds * 1000:>9.3f}ms "
+            f"{report.time_saved_seconds:>10.3f}s {report.bytes_cached:>12,}"
+        )
+        for key, count in report.hottest_keys:
+            lines.append(f"    {count:>10,} x {key[:80]}")
+    return "\n".join(lines)
+
+
+ReportHook = Callable[[list[FunctionReport]], None]
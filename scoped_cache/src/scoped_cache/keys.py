@@ -0,0 +1,110 @@
+"""
+Key functions for memoizing functions that take unhashable arguments
+
+By default the cache key is made from the arguments themselves, just like
+functools.cache, so lists, dicts, arrays or pydantic models can't be used.
+Pass a key function to the decorator to make a hashable key instead:
+
+>>> @memoize_with_scope_cache(key=structural_key)
+>>> def summarise(rows: list[dict], weights: numpy.ndarray):
+>>>     ...
+
+A key function is called with the same arguments as the decorated function
+and returns something hashable.
+"""
+
+import hashlib
+import dataclasses
+from typing import Any, Hashable
+
+_HASHABLE_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+
+def buffer_digest(obj: Any) -> tuple:
+    """Return a hashable digest of the contents of a buffer (e.g. a numpy array)
+
+    The buffer is hashed in place through a memoryview, without copying it,
+    unless it isn't contiguous. The format and shape are part of the digest
+    so the same bytes viewed differently make a different key.
+
+    Raises ValueError for buffers of pointers, like numpy object arrays,
+    because their bytes are addresses that can be reused by other objects.
+    """
+    view = memoryview(obj)
+    if "O" in view.format or "P" in view.format:
+        raise ValueError(f"can't digest a buffer of pointers ({view.format})")
+    contents = view if view.c_contiguous else view.tobytes()
+    return (
+        type(obj),
+        view.format,
+        view.shape,
+        hashlib.blake2b(contents, digest_size=16).digest(),
+    )
+
+
+def _freeze(obj: Any) -> Hashable:
+    if isinstance(obj, _HASHABLE_TYPES):
+        return obj
+    if isinstance(obj, (tuple, list)):
+        return (type(obj), tuple(_freeze(item) for item in obj))
+    if isinstance(obj, dict):
+        return (
+            type(obj),
+            frozenset((_freeze(key), _freeze(value)) for key, value in obj.items()),
+        )
+    if isinstance(obj, (set, frozenset)):
+        return (type(obj), frozenset(_freeze(item) for item in obj))
+    try:
+        return buffer_digest(obj)
+    except (TypeError, ValueError):
+        # not a buffer, or a buffer of pointers (numpy object arrays)
+        pass
+    if hasattr(obj, "tolist") and hasattr(obj, "shape"):
+        # numpy arrays that can't be digested, by their elements
+        return (type(obj), obj.shape, _freeze(obj.tolist()))
+    if hasattr(obj, "model_dump"):
+        # pydantic models
+        return (type(obj), _freeze(obj.model_dump()))
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return (
+            type(obj),
+            tuple(_freeze(getattr(obj, f.name)) for f in dataclasses.fields(obj)),
+        )
+    # Anything else has to be hashable already
+    hash(obj)
+    return obj
+
+
+def structural_key(*args, **kwargs) -> Hashable:
+    """Make a key from the structure and contents of the arguments
+
+    Lists, tuples, dicts and sets are converted (recursively) into hashable
+    equivalents, buffers like numpy arrays are hashed by content with
+    `buffer_digest`, and pydantic models and dataclasses by their fields.
+    """
+    return (_freeze(args), _freeze(kwargs) if kwargs else None)
+
+
+def content_key(*args, **kwargs) -> Hashable:
+    """Make a key by hashing any buffer (e.g. numpy array) argument by content
+
+    Other arguments are used as they are, so they have to be hashable. This
+    is quicker than `structural_key` when the only unhashable arguments are
+    arrays. Object arrays can't be hashed by content, use `structural_key`
+    for those.
+    """
+
+    def key(arg: Any) -> Hashable:
+        if isinstance(arg, _HASHABLE_TYPES):
+            return arg
+        try:
+            return buffer_digest(arg)
+        except (TypeError, ValueError):
+            return arg
+
+    return (
+        tuple(key(arg) for arg in args),
+        frozenset((name, key(arg)) for name, arg in kwargs.items())
+        if kwargs
+        else None,
+    )
@@ -0,0 +1,622 @@
+import time
+import pickle
+import asyncio
+import threading
+
+import pytest
+
+from scoped_cache import (
+    ScopeCache,
+    SQLiteBackend,
+    SharedMemoryBackend,
+    active_scope_cache,
+    batch_load_with_scope_cache,
+    buffer_digest,
+    content_key,
+    memoize_with_scope_cache,
+    structural_key,
+)
+from scoped_cache.instrumentation import TRACKED_KEYS
+
+
+def recording(result=lambda x: x * 2):
+    """Make a function that returns `result(x)`, and the list of its calls"""
+    calls = []
+
+    def function(x):
+        calls.append(x)
+        return result(x)
+
+    return function, calls
+
+
+def test_memoizes_per_scope_cache():
+    double, calls = recording()
+    memoized = memoize_with_scope_cache(double)
+
+    first, second = ScopeCache(), ScopeCache()
+    assert [memoized(1, scope_cache=first) for _ in range(3)] == [2, 2, 2]
+    assert memoized(1, scope_cache=second) == 2
+    assert calls == [1, 1]
+
+
+def test_concurrent_coroutines_share_one_call():
+    calls = []
+
+    @memoize_with_scope_cache
+    async def fetch(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return x * 2
+
+    async def main():
+        with ScopeCache():
+            results = await asyncio.gather(*(fetch(1) for _ in range(10)))
+            assert await fetch(1) == 2
+        return results
+
+    assert asyncio.run(main()) == [2] * 10
+    assert calls == [1]
+
+
+def test_failed_coroutines_are_not_cached():
+    calls = []
+
+    @memoize_with_scope_cache
+    async def flaky(x):
+        calls.append(x)
+        if len(calls) == 1:
+            raise ValueError(x)
+        return x
+
+    async def main():
+        with ScopeCache():
+            with pytest.raises(ValueError):
+                await flaky(1)
+            assert await flaky(1) == await flaky(1) == 1
+
+    asyncio.run(main())
+    assert calls == [1, 1]
+
+
+def test_concurrent_threads_share_one_call():
+    release = threading.Event()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        release.wait(timeout=10)
+        return x * 2
+
+    memoized = memoize_with_scope_cache(slow)
+    scope_cache = ScopeCache()
+    results = []
+
+    def call():
+        results.append(memoized(1, scope_cache=scope_cache))
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Wait until every other thread is waiting for the first one's call
+    deadline = time.monotonic() + 10
+    while slow not in scope_cache and time.monotonic() < deadline:
+        time.sleep(0.001)
+    single_flight = scope_cache[slow].__wrapped__
+    while single_flight.coalesced < 7 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [2] * 8
+    assert calls == [1]
+
+
+@pytest.mark.parametrize(
+    "scope_cache",
+    [
+        # functools.lru_cache
+        ScopeCache(max_entries=2),
+        # PolicyCache
+        ScopeCache(max_entries=2, ttl=100.0),
+    ],
+    ids=["lru_cache", "PolicyCache"],
+)
+def test_max_entries_evicts_least_recently_used(scope_cache):
+    double, calls = recording()
+    memoized = memoize_with_scope_cache(double)
+
+    for x in [1, 2, 1, 3, 1, 2]:
+        memoized(x, scope_cache=scope_cache)
+
+    # 3 evicts 2 (1 was used more recently), then 2 evicts 3
+    assert calls == [1, 2, 3, 2]
+    info = scope_cache.cache_info()[double]
+    assert (info.hits, info.misses, info.currsize, info.evictions) == (2, 4, 2, 2)
+
+
+def test_ttl_expires_entries():
+    double, calls = recording()
+    memoized = memoize_with_scope_cache(double)
+    scope_cache = ScopeCache(ttl=0.05)
+
+    memoized(1, scope_cache=scope_cache)
+    memoized(1, scope_cache=scope_cache)
+    time.sleep(0.1)
+    memoized(1, scope_cache=scope_cache)
+
+    assert calls == [1, 1]
+    info = scope_cache.cache_info()[double]
+    assert (info.hits, info.misses, info.expirations) == (1, 2, 1)
+
+
+def test_max_bytes_evicts_least_recently_used_from_any_function():
+    first, first_calls = recording(lambda x: "x" * 1000)
+    second, second_calls = recording(lambda x: "y" * 1000)
+    first_memoized = memoize_with_scope_cache(first)
+    second_memoized = memoize_with_scope_cache(second)
+    # room for two results
+    scope_cache = ScopeCache(max_bytes=2500)
+
+    with scope_cache:
+        first_memoized(1)
+        second_memoized(1)
+        first_memoized(1)
+        # evicts second(1), the least recently used
+        second_memoized(2)
+        assert scope_cache.total_bytes <= scope_cache.max_bytes
+        first_memoized(1)
+        # evicts second(2)
+        second_memoized(1)
+
+    assert first_calls == [1]
+    assert second_calls == [1, 2, 1]
+    info = scope_cache.cache_info()
+    assert (info[first].evictions, info[second].evictions) == (0, 2)
+
+
+@pytest.mark.parametrize(
+    "scope_cache",
+    [ScopeCache(max_entries=5, ttl=100.0), ScopeCache(max_bytes=2000)],
+    ids=["max_entries", "max_bytes"],
+)
+def test_threads_sharing_a_bounded_scope_cache(scope_cache):
+    first = memoize_with_scope_cache(recording(lambda x: "x" * (x % 50))[0])
+    second = memoize_with_scope_cache(recording(lambda x: [x] * (x % 7))[0])
+    errors = []
+
+    def work(seed):
+        try:
+            for i in range(2000):
+                x = (i * seed) % 40
+                first(x, scope_cache=scope_cache)
+                second(x, scope_cache=scope_cache)
+                if scope_cache.max_bytes is not None:
+                    with scope_cache.lock:
+                        assert scope_cache.total_bytes <= scope_cache.max_bytes
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=work, args=(seed,)) for seed in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    if scope_cache.max_entries is not None:
+        for info in scope_cache.cache_info().values():
+            assert info.currsize <= scope_cache.max_entries
+
+
+def test_nested_calls_use_the_active_scope_cache():
+    double, calls = recording()
+    inner = memoize_with_scope_cache(double)
+
+    @memoize_with_scope_cache
+    def outer(x):
+        return inner(x) + inner(x + 1)
+
+    assert active_scope_cache() is None
+    with ScopeCache() as scope_cache:
+        assert active_scope_cache() is scope_cache
+        assert outer(1) == outer(1) == 6
+        assert outer(2) == 10
+        with ScopeCache() as nested:
+            assert active_scope_cache() is nested
+            outer(1)
+        assert active_scope_cache() is scope_cache
+    assert active_scope_cache() is None
+
+    # 1 and 2 for outer(1), 3 for outer(2), then 1 and 2 again in `nested`
+    assert calls == [1, 2, 3, 1, 2]
+
+
+def test_asyncio_tasks_use_the_active_scope_cache():
+    double, calls = recording()
+    memoized = memoize_with_scope_cache(double)
+
+    async def call():
+        return memoized(1)
+
+    async def main():
+        with ScopeCache():
+            tasks = [asyncio.create_task(call()) for _ in range(3)]
+            return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == [2, 2, 2]
+    assert calls == [1]
+
+
+def test_concurrently_entering_the_same_scope_cache():
+    double, calls = recording()
+    memoized = memoize_with_scope_cache(double)
+    reports = []
+    scope_cache = ScopeCache(instrument=reports.append)
+
+    async def task(x):
+        with scope_cache:
+            await asyncio.sleep(0.01 * x)
+            memoized(1)
+        return active_scope_cache()
+
+    async def main():
+        # The tasks leave their `with` blocks in a different order to the
+        # one they entered them in
+        return await asyncio.gather(*(task(x) for x in [3, 1, 2]))
+
+    assert asyncio.run(main()) == [None, None, None]
+
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def enter(x):
+        try:
+            with scope_cache:
+                barrier.wait(timeout=10)
+                memoized(1)
+                time.sleep(0.01 * x)
+            assert active_scope_cache() is None
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=enter, args=(x,)) for x in [3, 1, 2, 4]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert calls == [1]
+    # Reported once by the tasks and once by the threads, when the last
+    # block was left
+    assert len(reports) == 2
+
+
+def test_coroutine_results_count_towards_max_bytes():
+    @memoize_with_scope_cache
+    async def fetch(x):
+        await asyncio.sleep(0)
+        return "x" * 10_000
+
+    async def main(scope_cache):
+        with scope_cache:
+            await asyncio.gather(*(fetch(x) for x in range(20)))
+
+    scope_cache = ScopeCache(max_bytes=50_000)
+    asyncio.run(main(scope_cache))
+
+    # The results are sized, not the tasks holding them
+    assert 40_000 < scope_cache.total_bytes <= scope_cache.max_bytes
+    info = scope_cache.cache_info()[fetch.__wrapped__]
+    assert info.currsize == 4
+    assert info.evictions == 16
+
+
+def test_batch_loaded_results_count_towards_max_bytes():
+    @batch_load_with_scope_cache
+    async def load(keys):
+        return {key: "x" * 10_000 for key in keys}
+
+    async def main(scope_cache):
+        with scope_cache:
+            await asyncio.gather(*(load(key) for key in range(20)))
+
+    scope_cache = ScopeCache(max_bytes=50_000)
+    asyncio.run(main(scope_cache))
+
+    assert 40_000 < scope_cache.total_bytes <= scope_cache.max_bytes
+    assert scope_cache.cache_info()[load.__wrapped__].currsize == 4
+
+
+def test_batch_loader_coalesces_async_loads():
+    batches = []
+
+    @batch_load_with_scope_cache
+    async def load_users(user_ids):
+        batches.append(user_ids)
+        await asyncio.sleep(0)
+        return {user_id: f"user {user_id}" for user_id in user_ids if user_id != 404}
+
+    async def main():
+        with ScopeCache():
+            users = await asyncio.gather(*(load_users(i) for i in [1, 2, 3, 1]))
+            assert users == ["user 1", "user 2", "user 3", "user 1"]
+            assert await load_users(2) == "user 2"
+            assert await load_users.load_many([3, 4]) == ["user 3", "user 4"]
+
+            # Missing keys raise KeyError and aren't cached
+            for _ in range(2):
+                with pytest.raises(KeyError):
+                    await load_users(404)
+
+    asyncio.run(main())
+    assert batches == [[1, 2, 3], [4], [404], [404]]
+
+
+def test_batch_loader_load_many():
+    batches = []
+
+    @batch_load_with_scope_cache
+    def load_users(user_ids):
+        batches.append(user_ids)
+        return {user_id: f"user {user_id}" for user_id in user_ids if user_id != 404}
+
+    with ScopeCache():
+        assert load_users.load_many([1, 2, 1]) == ["user 1", "user 2", "user 1"]
+        assert load_users(2) == "user 2"
+        assert load_users.load_many([2, 3]) == ["user 2", "user 3"]
+        with pytest.raises(KeyError):
+            load_users(404)
+    # Without a ScopeCache every call loads
+    assert load_users(1) == "user 1"
+
+    assert batches == [[1, 2], [3], [404], [1]]
+
+
+def test_without_a_scope_cache_calls_straight_through():
+    double, calls = recording()
+    memoized = memoize_with_scope_cache(double)
+
+    assert memoized(1) == memoized(1) == 2
+    assert calls == [1, 1]
+
+
+def test_keyword_arguments():
+    calls = []
+
+    @memoize_with_scope_cache
+    def power(x, exponent=2):
+        calls.append((x, exponent))
+        return x**exponent
+
+    with ScopeCache():
+        assert power(3) == power(3) == 9
+        assert power(3, exponent=3) == power(3, exponent=3) == 27
+        assert power(x=3, exponent=3) == 27
+
+    assert calls == [(3, 2), (3, 3), (3, 3)]
+
+
+def test_cache_info_of_instrumented_functions():
+    double, calls = recording()
+    memoized = memoize_with_scope_cache(double)
+    scope_cache = ScopeCache(max_entries=1, instrument=lambda reports: None)
+
+    for x in [1, 1, 2, 1]:
+        memoized(x, scope_cache=scope_cache)
+
+    info = scope_cache.cache_info()[double]
+    assert (info.hits, info.misses, info.currsize, info.evictions) == (1, 3, 1, 2)
+    scope_cache.cache_clear()
+    assert scope_cache.cache_info()[double].misses == 0
+
+
+def test_sqlite_backend_round_trip(tmp_path):
+    to_dict, calls = recording(lambda x: {"x": [x]})
+    memoized = memoize_with_scope_cache(to_dict)
+    path = tmp_path / "cache.sqlite3"
+
+    with ScopeCache(backend=SQLiteBackend(path)):
+        assert memoized(1) == {"x": [1]}
+    # A new scope (e.g. the next run) finds the result in the backend
+    with ScopeCache(backend=SQLiteBackend(path)) as scope_cache:
+        assert memoized(1) == {"x": [1]}
+        assert memoized(2) == {"x": [2]}
+        assert scope_cache[to_dict].backend_hits == 1
+
+    assert calls == [1, 2]
+    assert len(list(SQLiteBackend(path).items())) == 2
+
+
+def test_sqlite_backend_round_trip_for_coroutines(tmp_path):
+    calls = []
+
+    @memoize_with_scope_cache
+    async def fetch(x):
+        calls.append(x)
+        return x * 2
+
+    async def main():
+        for _ in range(2):
+            with ScopeCache(backend=SQLiteBackend(tmp_path / "cache.sqlite3")):
+                assert await asyncio.gather(fetch(1), fetch(1)) == [2, 2]
+
+    asyncio.run(main())
+    assert calls == [1]
+
+
+def test_shared_memory_backend_round_trip():
+    backend = SharedMemoryBackend(slots=64, slot_size=256)
+    try:
+        double, calls = recording()
+        memoized = memoize_with_scope_cache(double)
+        with ScopeCache(backend=backend):
+            memoized(1)
+            # Values too big for a slot aren't stored, but are still cached
+            assert memoized("x" * 1000) == memoized("x" * 1000) == "x" * 2000
+
+        # Unpickling attaches to the same shared memory, like a worker would
+        attached = pickle.loads(pickle.dumps(backend))
+        try:
+            with ScopeCache(backend=attached):
+                assert memoized(1) == 2
+                memoized("x" * 1000)
+        finally:
+            attached.close()
+
+        assert calls == [1, "x" * 1000, "x" * 1000]
+    finally:
+        backend.close()
+        backend.unlink()
+
+
+def test_backend_keys_come_from_the_key_function(tmp_path):
+    calls = []
+
+    def ignoring_verbose(items, verbose=False):
+        return tuple(items)
+
+    @memoize_with_scope_cache(key=ignoring_verbose)
+    def total(items, verbose=False):
+        calls.append(items)
+        return sum(items)
+
+    @memoize_with_scope_cache(key=ignoring_verbose)
+    async def async_total(items, verbose=False):
+        calls.append(items)
+        return sum(items)
+
+    path = tmp_path / "cache.sqlite3"
+    with ScopeCache(backend=SQLiteBackend(path)):
+        assert total([1, 2, 3]) == 6
+        assert asyncio.run(async_total([1, 2, 3])) == 6
+    # Calls the key function treats as the same are found in the backend
+    with ScopeCache(backend=SQLiteBackend(path)):
+        assert total([1, 2, 3], verbose=True) == 6
+        assert asyncio.run(async_total([1, 2, 3], verbose=True)) == 6
+
+    assert calls == [[1, 2, 3], [1, 2, 3]]
+
+
+def test_instrumentation_report():
+    memoized = memoize_with_scope_cache(recording()[0])
+    reports = []
+
+    with ScopeCache(instrument=reports.extend):
+        for x in [1, 1, 1, 2]:
+            memoized(x)
+
+    [report] = reports
+    assert (report.calls, report.hits, report.misses) == (4, 2, 2)
+    assert report.hottest_keys[0] == ("(1,)", 3)
+
+
+@pytest.mark.parametrize(
+    "scope_cache",
+    [
+        # functools.lru_cache, estimated from the mean result size
+        ScopeCache(max_entries=2, instrument=lambda reports: None),
+        # PolicyCache, from the sizes of the entries
+        ScopeCache(max_bytes=2500, instrument=lambda reports: None),
+    ],
+    ids=["lru_cache", "PolicyCache"],
+)
+def test_instrumentation_reports_the_bytes_cached_now(scope_cache):
+    memoized = memoize_with_scope_cache(recording(lambda x: "x" * 1000)[0])
+
+    with scope_cache:
+        for x in range(5):
+            memoized(x)
+
+    [report] = scope_cache.report()
+    # Only two of the five results are still cached
+    assert 2000 < report.bytes_cached < 2500
+
+
+def test_instrumentation_counts_a_bounded_number_of_keys():
+    memoized = memoize_with_scope_cache(recording()[0])
+
+    with ScopeCache(instrument=lambda reports: None) as scope_cache:
+        for x in range(10_000):
+            memoized(x % 3 if x % 2 else x)
+
+    [stats] = scope_cache.stats.values()
+    assert len(stats.key_counts.counts) == TRACKED_KEYS
+    [report] = scope_cache.report()
+    assert sorted(key for key, count in report.hottest_keys[:3]) == [
+        "(0,)",
+        "(1,)",
+        "(2,)",
+    ]
+
+
+def test_key_function_for_unhashable_arguments():
+    length, calls = recording(len)
+    memoized = memoize_with_scope_cache(key=structural_key)(length)
+
+    with ScopeCache():
+        assert memoized([1, 2, {"a": 3}]) == 3
+        assert memoized([1, 2, {"a": 3}]) == 3
+        # A tuple and a list with the same items are different keys
+        assert memoized((1, 2, {"a": 3})) == 3
+
+    assert calls == [[1, 2, {"a": 3}], (1, 2, {"a": 3})]
+
+
+def test_content_key():
+    length, calls = recording(len)
+    memoized = memoize_with_scope_cache(key=content_key)(length)
+
+    with ScopeCache():
+        assert memoized(b"abc") == memoized(b"abc") == 3
+        assert memoized(bytearray(b"abc")) == memoized(bytearray(b"abc")) == 3
+        # Other arguments still have to be hashable
+        with pytest.raises(TypeError):
+            memoized([1, 2, 3])
+
+    assert calls == [b"abc", bytearray(b"abc")]
+
+
+@pytest.mark.parametrize("key", [structural_key, content_key])
+def test_numpy_array_keys(key):
+    numpy = pytest.importorskip("numpy")
+    total, calls = recording(lambda array: int(array.sum()))
+    memoized = memoize_with_scope_cache(key=key)(total)
+
+    array = numpy.arange(12, dtype=numpy.int64)
+    with ScopeCache():
+        assert memoized(array) == memoized(array.copy()) == 66
+        # The same bytes viewed differently are different keys
+        memoized(array.reshape(3, 4))
+        memoized(array.view(numpy.float64))
+        # Not contiguous
+        assert memoized(array[::2]) == memoized(array[::2].copy()) == 30
+
+    assert len(calls) == 4
+
+
+def test_numpy_object_array_keys():
+    numpy = pytest.importorskip("numpy")
+
+    class Box:
+        def __init__(self, value):
+            self.value = value
+
+    @memoize_with_scope_cache(key=structural_key)
+    def unbox(array):
+        return array[0].value
+
+    with ScopeCache():
+        # Object arrays hold pointers, which are reused once each box is
+        # garbage collected, so they must be keyed by their elements
+        results = [unbox(numpy.array([Box(value)], dtype=object)) for value in range(5)]
+        assert results == [0, 1, 2, 3, 4]
+
+    assert structural_key(numpy.array(["a", 1], dtype=object)) == structural_key(
+        numpy.array(["a", 1], dtype=object)
+    )
+
+    with pytest.raises(ValueError):
+        buffer_digest(numpy.array([Box(0)], dtype=object))
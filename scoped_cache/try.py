@@ -3,6 +3,7 @@ import scoped_cache
 from rich import print
 
 logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+scoped_cache.LOG_CALLS = True
 
 @scoped_cache.memoize_with_scope_cache
 def count_vowels(sentence):
@@ -19,5 +20,10 @@ def main():
     print(count_vowels("This call is cached", scope_cache=cache))
     print(cache.cache_info())
 
+    with scoped_cache.ScopeCache() as cache:
+        print(count_vowels("This call uses the active cache"))
+        print(count_vowels("This call uses the active cache"))
+        print(cache.cache_info())
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+"""
+Benchmark suite for uuid7.py
+
+Covers single-call latency (with percentiles), batch throughput,
+multi-threaded contention and serialization cost, with the stdlib's
+uuid.uuid4 as a point of comparison.
+
+Every benchmark reports `ns_per_op` (lower is better), which is what gets
+compared between runs:
+
+    $ python bench_uuid7.py --output before.json
+    ... change something ...
+    $ python bench_uuid7.py --output after.json --compare before.json
+
+With `--compare`, any benchmark that got more than `--threshold` slower is
+reported and the exit status is 1.
+"""
+
+import sys
+import json
+import time
+import uuid
+import platform
+import datetime
+import statistics
+
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import uuid7
+
+Results = dict[str, dict[str, float]]
+
+# Single calls are too quick to time individually, so latency is measured
+# over groups of calls and the percentiles are of the per-call average.
+LATENCY_GROUP_SIZE = 100
+LATENCY_GROUPS = 5_000
+
+BATCH_SIZE = 10_000
+THROUGHPUT_NUMBER = 500_000
+THREAD_COUNTS = (1, 4, 16)
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def bench_latency(func: Callable[[], object]) -> dict[str, float]:
+    """Time `func()` and return the mean and percentile latencies"""
+    func()
+    calls = range(LATENCY_GROUP_SIZE)
+    timings = []
+    for _ in range(LATENCY_GROUPS):
+        start = time.perf_counter_ns()
+        for _ in calls:
+            func()
+        timings.append((time.perf_counter_ns() - start) / LATENCY_GROUP_SIZE)
+    timings.sort()
+    return {
+        # The median is much less noisy than the mean for spotting regressions
+        "ns_per_op": _percentile(timings, 0.50),
+        "mean_ns": statistics.fmean(timings),
+        "p90_ns": _percentile(timings, 0.90),
+        "p99_ns": _percentile(timings, 0.99),
+        "p999_ns": _percentile(timings, 0.999),
+    }
+
+
+def bench_batch(output: uuid7.BatchOutput) -> dict[str, float]:
+    generator = uuid7.UUIDv7Generator()
+    batches = THROUGHPUT_NUMBER // BATCH_SIZE
+    start = time.perf_counter_ns()
+    for _ in range(batches):
+        generator.batch(BATCH_SIZE, output)
+    duration = time.perf_counter_ns() - start
+    number = batches * BATCH_SIZE
+    return {"ns_per_op": duration / number, "ops_per_sec": number * 10**9 / duration}
+
+
+def bench_contention(num_threads: int) -> dict[str, float]:
+    generator = uuid7.ThreadSafeUUIDv7Generator()
+    per_thread = THROUGHPUT_NUMBER // num_threads
+
+    def work(_):
+        for _ in range(per_thread):
+            generator()
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        start = time.perf_counter_ns()
+        list(executor.map(work, range(num_threads)))
+        duration = time.perf_counter_ns() - start
+
+    number = per_thread * num_threads
+    return {"ns_per_op": duration / number, "ops_per_sec": number * 10**9 / duration}
+
+
+def run() -> Results:
+    results: Results = {}
+
+    def record(name: str, result: dict[str, float]) -> None:
+        results[name] = result
+        print(f"{name:<32} {result['ns_per_op']:>10,.0f} ns/op", file=sys.stderr)
+
+    record("latency.UUIDv7Generator", bench_latency(uuid7.UUIDv7Generator()))
+    record(
+        "latency.LegacyUUIDv7Generator", bench_latency(uuid7.LegacyUUIDv7Generator())
+    )
+    record(
+        "latency.ThreadSafeUUIDv7Generator",
+        bench_latency(uuid7.ThreadSafeUUIDv7Generator()),
+    )
+    record("latency.uuid.uuid4", bench_latency(uuid.uuid4))
+
+    for output in ("uuid", "int", "bytes", "packed"):
+        record(f"batch.{output}", bench_batch(output))
+
+    for num_threads in THREAD_COUNTS:
+        record(f"contention.{num_threads}_threads", bench_contention(num_threads))
+
+    value = uuid7.uuid7()
+    record("serialize.str", bench_latency(lambda: str(value)))
+    record("serialize.bytes", bench_latency(lambda: value.bytes))
+    record("serialize.hex", bench_latency(lambda: value.hex))
+
+    return results
+
+
+def compare(results: Results, baseline: Results, threshold: float) -> list[str]:
+    """Return a description of every benchmark that regressed past `threshold`"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["ns_per_op"]
+        after = result["ns_per_op"]
+        change = (after - before) / before
+        if change > threshold:
+            regressions.append(
+                f"{name}: {before:,.0f} -> {after:,.0f} ns/op ({change:+.1%})"
+            )
+    return regressions
+
+
+def _main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark uuid7.py")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against a previous JSON results file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fractional slowdown that counts as a regression (default 0.1)",
+    )
+    args = parser.parse_args()
+
+    results = run()
+    report = {
+        "meta": {
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": sys.version,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    _main()
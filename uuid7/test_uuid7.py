@@ -1,3 +1,5 @@
+import uuid
+import itertools
 from unittest.mock import patch
 from uuid import UUID
 from typing import Iterable
@@ -38,15 +40,232 @@ def test_increment_rand_b():
 def test_overflow_rand_b():
     generator = uuid7.UUIDv7Generator()
     generator.unix_time_ns_func = MockIntReturner([0, 0, 1_000_000])
-    LARGEST_POSSIBLE_RAND_B = (1 << 63) - 1
+    LARGEST_POSSIBLE_RAND_B = (1 << 62) - 1
     generator.randbits_func = MockIntReturner([LARGEST_POSSIBLE_RAND_B, 1, 15])
 
     first_uuid = generator()
-    assert first_uuid == UUID("00000000-0000-7000-ffff-ffffffffffff")
+    assert first_uuid == UUID("00000000-0000-7000-bfff-ffffffffffff")
     print(f"{first_uuid=}")
 
     with patch("time.sleep") as mock_sleep:
         with pytest.warns(UserWarning):
             result = generator()
     mock_sleep.assert_called_with(uuid7.SLEEP_TIME)
+    assert generator.overflow_sleeps == 1
     assert result == UUID("00000000-0001-7000-8000-00000000000f")
+
+
+def test_batch():
+    generator = uuid7.UUIDv7Generator()
+    generator.unix_time_ns_func = lambda: 1685940240093527761
+    generator.randbits_func = MockIntReturner([258941218144316131, 2 | (5 << 32)])
+
+    result = generator.batch(3)
+    assert result == [
+        UUID("018889de-7edd-7871-8397-f1aa7d32eae3"),
+        UUID("018889de-7edd-7871-8397-f1aa7d32eae6"),
+        UUID("018889de-7edd-7871-8397-f1aa7d32eaec"),
+    ]
+
+
+def test_rand_b_never_carries_into_variant():
+    # rand_b is one increment short of overflowing its 62 bits
+    generator = uuid7.UUIDv7Generator()
+    generator.unix_time_ns_func = MockIntReturner([0, 0, 1_000_000])
+    generator.randbits_func = MockIntReturner([(1 << 62) - 2, 1, 15])
+    generator()
+    with patch("time.sleep"), pytest.warns(UserWarning):
+        result = generator()
+    assert result.version == 7
+    assert result.variant == uuid.RFC_4122
+    assert generator.overflow_sleeps == 1
+
+    # A batch whose increments would run past the end of rand_b
+    def randbits(bits: int) -> int:
+        if bits == 62:
+            return (1 << 62) - 1000
+        # Every 32 bit word is an increment of 1 << 30
+        word = ((1 << 30) - 1).to_bytes(4, "little")
+        return int.from_bytes(word * (bits // 32), "little")
+
+    generator = uuid7.UUIDv7Generator()
+    generator.unix_time_ns_func = itertools.count(0, 1_000_000).__next__
+    generator.randbits_func = randbits
+    result = generator.batch(4)
+    assert all(u.version == 7 and u.variant == uuid.RFC_4122 for u in result)
+    assert result == sorted(result)
+
+
+def test_batch_continues_from_previous():
+    generator = uuid7.UUIDv7Generator()
+    generator.unix_time_ns_func = lambda: 1685940240093527761
+    generator.randbits_func = MockIntReturner([258941218144316131, 2, 1])
+
+    first = generator()
+    assert generator.batch(1) == [UUID("018889de-7edd-7871-8397-f1aa7d32eae6")]
+    assert generator() == UUID("018889de-7edd-7871-8397-f1aa7d32eae8")
+    assert first == UUID("018889de-7edd-7871-8397-f1aa7d32eae3")
+
+
+@pytest.mark.parametrize("output", ["uuid", "int", "bytes", "packed"])
+def test_batch_output(output):
+    generator = uuid7.UUIDv7Generator()
+    result = generator.batch(1000, output)
+    if output == "packed":
+        assert len(result) == 16000
+        result = [result[i : i + 16] for i in range(0, len(result), 16)]
+    assert len(result) == 1000
+    assert result == sorted(set(result))
+
+
+def test_thread_safe_generator():
+    from concurrent.futures import ThreadPoolExecutor
+
+    generator = uuid7.ThreadSafeUUIDv7Generator()
+
+    def work(_):
+        return [generator() for _ in range(2000)]
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(work, range(8)))
+
+    for result in results:
+        assert result == sorted(result)
+    assert len({u for result in results for u in result}) == 8 * 2000
+
+
+def test_thread_safe_generator_resets_after_fork():
+    generator = uuid7.ThreadSafeUUIDv7Generator()
+    generator()
+    uuid7._reset_all_after_fork()
+    assert generator.prev_uuid_int == -1
+    assert generator.prev_rand_b == -1
+
+
+def test_buffered_random():
+    buffered_random = uuid7.BufferedRandom(block_size=64)
+    for k in (0, 1, 31, 62, 64, 65, 200):
+        for _ in range(20):
+            assert 0 <= buffered_random.randbits(k) < 2**k
+
+
+def test_buffered_random_resets_after_fork():
+    buffered_random = uuid7.BufferedRandom()
+    buffered_random.randbits(62)
+    uuid7._reset_all_after_fork()
+    assert buffered_random._buffer.words == []
+
+
+@pytest.mark.parametrize(
+    "unix_time_ns", [0, 1, 999_999, 1_000_000, 1685940240093527761, 2**62 + 12345]
+)
+def test_legacy_generator_matches(unix_time_ns):
+    generators = [uuid7.UUIDv7Generator(), uuid7.LegacyUUIDv7Generator()]
+    results = []
+    for generator in generators:
+        generator.unix_time_ns_func = lambda: unix_time_ns
+        generator.randbits_func = MockIntReturner([258941218144316131, 7])
+        results.append((generator(), generator()))
+    assert results[0] == results[1]
+
+
+def test_extract_timestamp():
+    uuid = UUID("018889de-7edd-7871-8397-f1aa7d32eae3")
+    expected = 1685940240093 + 0x871 / 4096
+    assert uuid7.extract_timestamp(uuid) == expected
+    assert uuid7.extract_timestamp(uuid.int) == expected
+    assert uuid7.extract_timestamp(uuid.bytes) == expected
+    assert uuid7.extract_timestamp([uuid, uuid.bytes]) == [expected, expected]
+
+
+def test_min_max_uuid_for():
+    generator = uuid7.UUIDv7Generator()
+    generator.unix_time_ns_func = lambda: 1685940240093527761
+    generator.randbits_func = MockIntReturner([258941218144316131])
+    uuid = generator()
+
+    timestamp = uuid7.extract_timestamp(uuid)
+    assert uuid7.min_uuid_for(timestamp) == UUID("018889de-7edd-7871-8000-000000000000")
+    assert uuid7.max_uuid_for(timestamp) == UUID("018889de-7edd-7871-ffff-ffffffffffff")
+    assert uuid7.min_uuid_for(timestamp) < uuid < uuid7.max_uuid_for(timestamp)
+    assert uuid7.max_uuid_for(timestamp - 0.001) < uuid
+    assert uuid7.min_uuid_for(timestamp + 0.001) > uuid
+    assert uuid7.min_uuid_for([timestamp]) == [uuid7.min_uuid_for(timestamp)]
+
+
+def test_numpy_helpers():
+    numpy = pytest.importorskip("numpy")
+
+    generator = uuid7.UUIDv7Generator()
+    packed = generator.batch(10, "packed")
+    uuids = [UUID(bytes=packed[i : i + 16]) for i in range(0, len(packed), 16)]
+    expected = uuid7.extract_timestamp(uuids)
+
+    records = numpy.frombuffer(packed, dtype="S16")
+    columns = numpy.frombuffer(packed, dtype=">u8").reshape(-1, 2).astype(numpy.uint64)
+    assert uuid7.extract_timestamp(records).tolist() == expected
+    assert uuid7.extract_timestamp(columns).tolist() == expected
+
+    for func in (uuid7.min_uuid_for, uuid7.max_uuid_for):
+        bounds = func(numpy.array(expected))
+        assert [UUID(int=(int(hi) << 64) | int(lo)) for hi, lo in bounds] == func(
+            expected
+        )
+
+
+@pytest.mark.parametrize("output_format", uuid7.OUTPUT_FORMATS)
+def test_write_uuids(output_format):
+    import io
+    import json
+
+    generator = uuid7.UUIDv7Generator()
+    stream = io.BytesIO()
+    uuid7.write_uuids(5, output_format, stream, generator)
+    output = stream.getvalue()
+
+    if output_format == "binary":
+        uuids = [UUID(bytes=output[i : i + 16]) for i in range(0, len(output), 16)]
+    elif output_format == "jsonl":
+        uuids = [UUID(json.loads(line)) for line in output.splitlines()]
+    else:
+        uuids = [UUID(line.decode()) for line in output.splitlines()]
+        if output_format == "text":
+            assert output.decode() == "".join(f"{u}\n" for u in uuids)
+
+    assert len(uuids) == 5
+    assert uuids == sorted(uuids)
+    assert uuids[-1].int == generator.prev_uuid_int
+
+
+def test_stats():
+    generator = uuid7.UUIDv7Generator()
+    generator.unix_time_ns_func = MockIntReturner([1_000_000, 1_000_000, 0, 2_000_000])
+    generator.randbits_func = MockIntReturner([5, 1, 1, 7])
+
+    for _ in range(4):
+        generator()
+    assert generator.stats() == {
+        "collisions": 1,
+        "clock_regressions": 1,
+        "overflow_sleeps": 0,
+    }
+
+
+def test_hybrid_clock():
+    with patch("time.time_ns", return_value=5_000), patch(
+        "time.monotonic_ns", return_value=1_000
+    ):
+        clock = uuid7.HybridClock(resync_interval_ns=100)
+        assert clock() == 5_000
+
+    # The wall clock going backwards is ignored
+    with patch("time.time_ns", return_value=0), patch(
+        "time.monotonic_ns", return_value=1_200
+    ):
+        assert clock() == 5_200
+
+    # But it will resync forwards
+    with patch("time.time_ns", return_value=10_000), patch(
+        "time.monotonic_ns", return_value=1_400
+    ):
+        assert clock() == 10_000
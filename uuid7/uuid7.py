@@ -32,14 +32,31 @@ The guarantees that are provided by a UUIDv7 implementation are that:
 
 """
 
+import os
+import sys
+import math
 import uuid
 import time
-import secrets
+import struct
+import weakref
+import threading
 import warnings
-
-from typing import Final, Callable
-
-__all__ = ["UUIDv7Generator", "uuid7"]
+import itertools
+
+from typing import Final, Callable, Literal, Any, BinaryIO
+
+__all__ = [
+    "UUIDv7Generator",
+    "LegacyUUIDv7Generator",
+    "ThreadSafeUUIDv7Generator",
+    "BufferedRandom",
+    "HybridClock",
+    "uuid7",
+    "extract_timestamp",
+    "min_uuid_for",
+    "max_uuid_for",
+    "write_uuids",
+]
 
 NS_IN_MS: Final = 10**6
 
@@ -61,28 +78,137 @@ V7_RAND_B_RND_BITS: Final = 62
 # there's a timestamp collision.
 V7_RAND_B_INC_BITS: Final = 31
 
+V7_RAND_A_MASK: Final = (1 << V7_RAND_A_NUM_BITS) - 1
+V7_UNIX_TS_MS_MASK: Final = ~V7_RAND_A_MASK
+V7_VER_VAR_BITS: Final = (V7_VER << 76) | (V7_VAR << 62)
+
+# The lowest and highest possible bottom 64 bits (var + rand_b) of a UUIDv7
+V7_MIN_LOW_BITS: Final = V7_VAR << 62
+V7_MAX_LOW_BITS: Final = (1 << 64) - 1
+
+# rand_b values at or beyond this limit don't fit in rand_b's 62 bits (they'd
+# carry into the variant bits) and are treated as a counter overflow.
+V7_RAND_B_LIMIT: Final = 1 << V7_RAND_B_NUM_BITS
+
+BatchOutput = Literal["uuid", "int", "bytes", "packed"]
+
+# Anything with a `_reset_after_fork()` method that needs to drop state it
+# shouldn't share with its parent when the process forks.
+_fork_sensitive: weakref.WeakSet = weakref.WeakSet()
+
+
+def _reset_all_after_fork() -> None:
+    for obj in _fork_sensitive:
+        obj._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_all_after_fork)
+
+
+class _RandomWords(threading.local):
+    def __init__(self) -> None:
+        self.words: list[int] = []
+
+
+class BufferedRandom:
+    """A drop-in replacement for `secrets.randbits` that buffers os.urandom
+
+    Asking the OS for 8 bytes at a time costs a syscall per UUID, so this
+    prefetches `block_size` bytes, splits them into 64 bit words and hands
+    them out one at a time, refilling when it runs dry. Each thread gets its
+    own buffer, and the buffers are thrown away in a forked child so it never
+    replays its parent's bytes.
+    """
+
+    def __init__(self, block_size: int = 4096) -> None:
+        self.block_size = block_size
+        self._buffer = _RandomWords()
+        _fork_sensitive.add(self)
+
+    def randbits(self, k: int) -> int:
+        if k > 64:
+            num_bytes = (k + 7) >> 3
+            return int.from_bytes(os.urandom(num_bytes), "little") >> (
+                (num_bytes << 3) - k
+            )
+        words = self._buffer.words
+        if not words:
+            words.extend(
+                struct.unpack(f"<{self.block_size >> 3}Q", os.urandom(self.block_size))
+            )
+        return words.pop() >> (64 - k)
+
+    def _reset_after_fork(self) -> None:
+        self._buffer = _RandomWords()
+
+
+_buffered_random = BufferedRandom()
+
+
+class HybridClock:
+    """A drop-in replacement for `time.time_ns` that never goes backwards
+
+    The wall clock is read once to anchor the clock, after that it advances
+    with `time.monotonic_ns()`. Every `resync_interval_ns` it checks the wall
+    clock again and jumps forward if the wall clock has got ahead, but it
+    never follows the wall clock backwards (e.g. when NTP slews it).
+
+    Use it with `generator.unix_time_ns_func = HybridClock()`.
+    """
+
+    def __init__(self, resync_interval_ns: int = 10**9) -> None:
+        self.resync_interval_ns = resync_interval_ns
+        monotonic_ns = time.monotonic_ns()
+        self._offset_ns = time.time_ns() - monotonic_ns
+        self._next_resync_ns = monotonic_ns + resync_interval_ns
+
+    def __call__(self) -> int:
+        monotonic_ns = time.monotonic_ns()
+        if monotonic_ns >= self._next_resync_ns:
+            self._next_resync_ns = monotonic_ns + self.resync_interval_ns
+            offset_ns = time.time_ns() - monotonic_ns
+            if offset_ns > self._offset_ns:
+                self._offset_ns = offset_ns
+        return monotonic_ns + self._offset_ns
+
 
 class UUIDv7Generator:
-    prev_rand_a = -1
+    # unix_ts_ms and rand_a of the previous UUID packed into a single 60 bit
+    # integer, (unix_ts_ms << 12) | rand_a, so they can be compared in one go.
+    prev_timestamp = -1
     prev_rand_b = -1
     prev_uuid_int = -1
-    prev_unix_time_ms = -1
+
+    # How many times the clock hadn't ticked forward since the previous UUID,
+    # how many times it had gone backwards, and how many times the rand_b
+    # counter overflowed and we had to sleep waiting for the clock.
+    collisions = 0
+    clock_regressions = 0
+    overflow_sleeps = 0
 
     unix_time_ns_func: Callable[..., int] = time.time_ns
-    randbits_func: Callable[[int], int] = secrets.randbits
+    randbits_func: Callable[[int], int] = _buffered_random.randbits
 
-    def __call__(self):
-        unix_time_ns = self.unix_time_ns_func()
+    @property
+    def prev_unix_time_ms(self) -> int:
+        return self.prev_timestamp >> V7_RAND_A_NUM_BITS
 
-        unix_time_ms, remainder_ns = divmod(unix_time_ns, NS_IN_MS)
+    @property
+    def prev_rand_a(self) -> int:
+        return self.prev_timestamp & V7_RAND_A_MASK
 
+    def __call__(self):
         # rand_a is used to provide further clock precision as
         # precribed in the section 'Replace Left-Most Random Bits with Increased
         # Clock Precision (Method 3)' of the RFC:
         # https://www.ietf.org/archive/id/draft-ietf-uuidrev-rfc4122bis-05.html#section-6.2-5.6.1
-        rand_a = int((remainder_ns / NS_IN_MS) * (2**V7_RAND_A_NUM_BITS))
+        #
+        # floor(ns * 2**12 / NS_IN_MS) is exactly (unix_ts_ms << 12) | rand_a,
+        # without going through floats or a divmod tuple.
+        timestamp = (self.unix_time_ns_func() << V7_RAND_A_NUM_BITS) // NS_IN_MS
 
-        if (unix_time_ms, rand_a) > (self.prev_unix_time_ms, self.prev_rand_a):
+        if timestamp > self.prev_timestamp:
             # The normal case: the time data is new so we generate new random
             # data for rand_b
             rand_b = self.randbits_func(V7_RAND_B_RND_BITS)
@@ -94,30 +220,179 @@ class UUIDv7Generator:
             #
             # https://www.ietf.org/archive/id/draft-ietf-uuidrev-rfc4122bis-05.html#section-6.2-5.4.1
 
+            if timestamp == self.prev_timestamp:
+                self.collisions += 1
+            else:
+                self.clock_regressions += 1
+
             # use the prior timestamp
+            timestamp = self.prev_timestamp
+
+            # use the prior rand_b but increment it by a random amount.
+            rand_b = self.prev_rand_b + self.randbits_func(V7_RAND_B_INC_BITS) + 1
+
+            if rand_b >= V7_RAND_B_LIMIT:
+                return self._overflow()
+
+        uuid_int = (
+            ((timestamp & V7_UNIX_TS_MS_MASK) << 68)
+            | ((timestamp & V7_RAND_A_MASK) << 64)
+            | V7_VER_VAR_BITS
+            | rand_b
+        )
+
+        assert self.prev_uuid_int < uuid_int, (
+            "Generated a UUID that was not greater than the previous:\n"
+            f"{uuid.UUID(int=self.prev_uuid_int)}\n{uuid.UUID(int=uuid_int)}"
+        )
+        self.prev_uuid_int = uuid_int
+        self.prev_timestamp = timestamp
+        self.prev_rand_b = rand_b
+
+        return uuid.UUID(int=uuid_int)
+
+    def stats(self) -> dict[str, int]:
+        """Return the collision, clock regression and overflow sleep counts"""
+        return {
+            "collisions": self.collisions,
+            "clock_regressions": self.clock_regressions,
+            "overflow_sleeps": self.overflow_sleeps,
+        }
+
+    def _overflow(self):
+        # On the average case, we'd have had to increment rand_b over
+        # a billion times (i.e. generate a billion UUIDs without the
+        # clock stepping forward) for this to happen. If it *does*
+        # happen, the RFC suggests in 'Counter Rollover Handling'
+        # that the generator should freeze.
+
+        # This call only tries to sleep for 500ns, but in practice the
+        # call to sleep() seems to take over 3000ns so the clock REALLY
+        # should have ticked by then!
+        self.overflow_sleeps += 1
+        warnings.warn(
+            "The uuid7 generation counter has overflowed. This shouldn't "
+            "be possible unless the system clock is misbahaving/going backward."
+        )
+        time.sleep(SLEEP_TIME)
+        return self()
+
+    def batch(self, n: int, output: BatchOutput = "uuid"):
+        """Generate `n` strictly increasing UUIDv7s in one go
+
+        The clock is read once for the whole batch, and the random
+        increments for rand_b are drawn in a single call to `randbits_func`,
+        so this is much cheaper per-id than calling the generator `n` times.
+
+        `output` selects what is returned:
+
+            - "uuid": a list of `uuid.UUID`
+            - "int": a list of 128 bit `int`s
+            - "bytes": a list of 16 byte `bytes`
+            - "packed": a single `bytes` of n*16 bytes
+        """
+        uuid_ints = self._batch_ints(n)
+
+        if output == "uuid":
+            return [uuid.UUID(int=uuid_int) for uuid_int in uuid_ints]
+        if output == "int":
+            return uuid_ints
+        if output == "bytes":
+            return [uuid_int.to_bytes(16, "big") for uuid_int in uuid_ints]
+        if output == "packed":
+            return b"".join([uuid_int.to_bytes(16, "big") for uuid_int in uuid_ints])
+        raise ValueError(f"unknown batch output {output!r}")
+
+    generate_many = batch
+
+    def _batch_ints(self, n: int) -> list[int]:
+        if n <= 0:
+            return []
+
+        timestamp = (self.unix_time_ns_func() << V7_RAND_A_NUM_BITS) // NS_IN_MS
+
+        if timestamp > self.prev_timestamp:
+            first_rand_b = self.randbits_func(V7_RAND_B_RND_BITS)
+            increments = self._rand_b_increments(n - 1)
+        else:
+            # Same collision handling as __call__, every id in the batch
+            # just increments from the previous rand_b.
+            if timestamp == self.prev_timestamp:
+                self.collisions += 1
+            else:
+                self.clock_regressions += 1
+            timestamp = self.prev_timestamp
+            first_rand_b = self.prev_rand_b
+            increments = self._rand_b_increments(n)
+
+        rand_bs = list(itertools.accumulate(increments, initial=first_rand_b))
+        if len(rand_bs) > n:
+            del rand_bs[0]
+
+        if rand_bs[-1] >= V7_RAND_B_LIMIT:
+            # The counter would overflow part way through the batch, let
+            # __call__ deal with waiting for the clock one id at a time.
+            return [self().int for _ in range(n)]
+
+        time_bits = (
+            ((timestamp & V7_UNIX_TS_MS_MASK) << 68)
+            | ((timestamp & V7_RAND_A_MASK) << 64)
+            | V7_VER_VAR_BITS
+        )
+        uuid_ints = [time_bits | rand_b for rand_b in rand_bs]
+
+        assert self.prev_uuid_int < uuid_ints[0], (
+            "Generated a UUID that was not greater than the previous:\n"
+            f"{uuid.UUID(int=self.prev_uuid_int)}\n{uuid.UUID(int=uuid_ints[0])}"
+        )
+        self.prev_uuid_int = uuid_ints[-1]
+        self.prev_timestamp = timestamp
+        self.prev_rand_b = rand_bs[-1]
+
+        return uuid_ints
+
+    def _rand_b_increments(self, count: int) -> list[int]:
+        """Draw `count` random rand_b increments with a single randbits call"""
+        if count <= 0:
+            return []
+        # Draw a 32 bit word per increment and keep the low V7_RAND_B_INC_BITS.
+        words = struct.unpack(
+            f"<{count}I", self.randbits_func(32 * count).to_bytes(4 * count, "little")
+        )
+        mask = (1 << V7_RAND_B_INC_BITS) - 1
+        return [(word & mask) + 1 for word in words]
+
+
+class LegacyUUIDv7Generator(UUIDv7Generator):
+    """The original float-and-tuple implementation of UUIDv7Generator.__call__
+
+    Produces exactly the same UUIDs as UUIDv7Generator, it's kept around so
+    that `--benchmark` can compare the two.
+    """
+
+    def __call__(self):
+        unix_time_ns = self.unix_time_ns_func()
+
+        unix_time_ms, remainder_ns = divmod(unix_time_ns, NS_IN_MS)
+
+        rand_a = int((remainder_ns / NS_IN_MS) * (2**V7_RAND_A_NUM_BITS))
+
+        if (unix_time_ms, rand_a) > (self.prev_unix_time_ms, self.prev_rand_a):
+            rand_b = self.randbits_func(V7_RAND_B_RND_BITS)
+        else:
+            if (unix_time_ms, rand_a) == (self.prev_unix_time_ms, self.prev_rand_a):
+                self.collisions += 1
+            else:
+                self.clock_regressions += 1
+
             unix_time_ms = self.prev_unix_time_ms
             rand_a = self.prev_rand_a
 
-            # use the prior rand_b but increment it by a random amount.
             increment = self.randbits_func(V7_RAND_B_INC_BITS) + 1
             rand_b = self.prev_rand_b + increment
 
-            if rand_b >= (1 << (V7_RAND_B_NUM_BITS + 1)) - 1:
-                # On the average case, we'd have had to increment rand_b over
-                # a billion times (i.e. generate a billion UUIDs without the
-                # clock stepping forward) for this to happen. If it *does*
-                # happen, the RFC suggests in 'Counter Rollover Handling'
-                # that the generator should freeze.
-
-                # This call only tries to sleep for 500ns, but in practice the
-                # call to sleep() seems to take over 3000ns so the clock REALLY
-                # should have ticked by then!
-                warnings.warn(
-                    "The uuid7 generation counter has overflowed. This shouldn't "
-                    "be possible unless the system clock is misbahaving/going backward."
-                )
-                time.sleep(SLEEP_TIME)
-                return self()
+            if rand_b >= V7_RAND_B_LIMIT:
+                return self._overflow()
 
         uuid_int = (
             (unix_time_ms << 80)
@@ -132,27 +407,281 @@ class UUIDv7Generator:
             f"{uuid.UUID(int=self.prev_uuid_int)}\n{uuid.UUID(int=uuid_int)}"
         )
         self.prev_uuid_int = uuid_int
-        self.prev_unix_time_ms = unix_time_ms
-        self.prev_rand_a = rand_a
+        self.prev_timestamp = (unix_time_ms << V7_RAND_A_NUM_BITS) | rand_a
         self.prev_rand_b = rand_b
 
         return uuid.UUID(int=uuid_int)
 
 
-uuid7 = UUIDv7Generator()
+class ThreadSafeUUIDv7Generator(UUIDv7Generator):
+    """A UUIDv7Generator that can be shared between threads
+
+    Generation is serialized with a lock so that two threads can't read
+    the same previous state and emit equal or out-of-order UUIDs.
+
+    It is also fork safe: in a child process the previous state is thrown
+    away (and the lock recreated) so the child doesn't carry on counting
+    from exactly the same place as its parent.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        _fork_sensitive.add(self)
+
+    def __call__(self):
+        with self._lock:
+            return super().__call__()
+
+    def _batch_ints(self, n: int) -> list[int]:
+        with self._lock:
+            return super()._batch_ints(n)
+
+    def _reset_after_fork(self) -> None:
+        self._lock = threading.RLock()
+        self.prev_timestamp = -1
+        self.prev_rand_b = -1
+        self.prev_uuid_int = -1
+
+
+uuid7 = ThreadSafeUUIDv7Generator()
+
+
+def _is_numpy_array(value: Any) -> bool:
+    # Don't import numpy just to find out we weren't given a numpy array
+    return type(value).__module__ == "numpy" and type(value).__name__ == "ndarray"
+
+
+def _high_bits_array(uuids):
+    """Return the top 64 bits of a numpy array of UUIDs as uint64
+
+    Accepts either an array of 16 byte records or two uint64 columns
+    (top 64 bits, bottom 64 bits).
+    """
+    import numpy
+
+    if uuids.ndim == 2 and uuids.shape[1] == 2:
+        return uuids[:, 0].astype(numpy.uint64)
+    if uuids.dtype.itemsize == 16:
+        return numpy.ascontiguousarray(uuids).view(">u8").reshape(-1, 2)[:, 0]
+    raise ValueError(
+        "expected an array of 16 byte records or two uint64 columns, "
+        f"got shape {uuids.shape} of {uuids.dtype}"
+    )
+
+
+def _uuid_int(value: uuid.UUID | int | bytes) -> int:
+    if isinstance(value, uuid.UUID):
+        return value.int
+    if isinstance(value, int):
+        return value
+    return int.from_bytes(value, "big")
+
+
+def extract_timestamp(uuids):
+    """Return the timestamp of UUIDv7s in (fractional) unix milliseconds
+
+    The result is unix_ts_ms + rand_a / 2**12, i.e. the millisecond
+    timestamp plus the sub-millisecond precision stored in rand_a.
+
+    Accepts a single UUID (a `uuid.UUID`, 128 bit `int` or 16 `bytes`) or a
+    sequence of them, in which case a list is returned. A numpy array of 16
+    byte records or of two uint64 columns returns a float64 array.
+    """
+    if _is_numpy_array(uuids):
+        import numpy
+
+        high_bits = _high_bits_array(uuids)
+        return (high_bits >> numpy.uint64(16)).astype(numpy.float64) + (
+            high_bits & numpy.uint64(V7_RAND_A_MASK)
+        ) / (1 << V7_RAND_A_NUM_BITS)
+
+    if isinstance(uuids, (uuid.UUID, int, bytes)):
+        uuid_int = _uuid_int(uuids)
+        return (uuid_int >> 80) + ((uuid_int >> 64) & V7_RAND_A_MASK) / (
+            1 << V7_RAND_A_NUM_BITS
+        )
+
+    return [extract_timestamp(u) for u in uuids]
+
+
+def _uuid_bounds_array(unix_ts_ms, low_bits: int, rounding: Callable[[Any], Any]):
+    """The numpy version of `_uuid_bounds_for`, returning two uint64 columns"""
+    import numpy
+
+    timestamps = rounding(unix_ts_ms * (1 << V7_RAND_A_NUM_BITS)).astype(numpy.uint64)
+    result = numpy.empty((len(timestamps), 2), dtype=numpy.uint64)
+    result[:, 0] = (
+        ((timestamps & numpy.uint64(V7_UNIX_TS_MS_MASK & (2**64 - 1))) << 4)
+        | numpy.uint64(V7_VER << 12)
+        | (timestamps & numpy.uint64(V7_RAND_A_MASK))
+    )
+    result[:, 1] = low_bits
+    return result
+
+
+def _uuid_bounds_for(unix_ts_ms, low_bits: int, rounding: Callable[[float], int]):
+    if isinstance(unix_ts_ms, (int, float)):
+        timestamp = int(rounding(unix_ts_ms * (1 << V7_RAND_A_NUM_BITS)))
+        return uuid.UUID(
+            int=((timestamp & V7_UNIX_TS_MS_MASK) << 68)
+            | ((timestamp & V7_RAND_A_MASK) << 64)
+            | V7_VER_VAR_BITS
+            | low_bits
+        )
+
+    return [_uuid_bounds_for(t, low_bits, rounding) for t in unix_ts_ms]
+
+
+def min_uuid_for(unix_ts_ms):
+    """Return the smallest UUIDv7 that could have been generated at or after
+    the (fractional) unix millisecond timestamp `unix_ts_ms`
+
+    Together with `max_uuid_for` this turns "created between T1 and T2" into
+    a primary key range: `min_uuid_for(T1) <= id <= max_uuid_for(T2)`.
+
+    Accepts a number or a sequence of numbers (returning a list of
+    `uuid.UUID`), or a numpy array which returns two uint64 columns.
+    """
+    if _is_numpy_array(unix_ts_ms):
+        import numpy
+
+        return _uuid_bounds_array(unix_ts_ms, V7_MIN_LOW_BITS, numpy.ceil)
+    return _uuid_bounds_for(unix_ts_ms, V7_MIN_LOW_BITS, math.ceil)
+
+
+def max_uuid_for(unix_ts_ms):
+    """Return the largest UUIDv7 that could have been generated at or before
+    the (fractional) unix millisecond timestamp `unix_ts_ms`
+
+    See `min_uuid_for`.
+    """
+    if _is_numpy_array(unix_ts_ms):
+        import numpy
+
+        return _uuid_bounds_array(unix_ts_ms, V7_MAX_LOW_BITS, numpy.floor)
+    return _uuid_bounds_for(unix_ts_ms, V7_MAX_LOW_BITS, math.floor)
+
+
+OutputFormat = Literal["text", "hex", "binary", "jsonl"]
+OUTPUT_FORMATS: Final = ("text", "hex", "binary", "jsonl")
+
+# How many UUIDs to generate and write to the output stream at a time
+OUTPUT_CHUNK_SIZE: Final = 65_536
+
+
+def _format_chunk(uuid_ints: list[int], output_format: OutputFormat) -> bytes:
+    if output_format == "binary":
+        return b"".join([uuid_int.to_bytes(16, "big") for uuid_int in uuid_ints])
+    if output_format == "hex":
+        return "".join([f"{uuid_int:032x}\n" for uuid_int in uuid_ints]).encode()
+
+    # Canonical 8-4-4-4-12 formatting, much quicker than str(uuid.UUID(...))
+    hexes = [f"{uuid_int:032x}" for uuid_int in uuid_ints]
+    if output_format == "text":
+        template = "{}-{}-{}-{}-{}\n"
+    elif output_format == "jsonl":
+        template = '"{}-{}-{}-{}-{}"\n'
+    else:
+        raise ValueError(f"unknown output format {output_format!r}")
+    return "".join(
+        [template.format(h[:8], h[8:12], h[12:16], h[16:20], h[20:]) for h in hexes]
+    ).encode()
+
+
+def write_uuids(
+    number: int,
+    output_format: OutputFormat = "text",
+    stream: BinaryIO | None = None,
+    generator: UUIDv7Generator | None = None,
+) -> None:
+    """Write `number` UUIDv7s to a binary stream (stdout by default)
+
+    UUIDs are generated with `UUIDv7Generator.batch` and written in chunks of
+    `OUTPUT_CHUNK_SIZE`, as canonical "text", 32 digit "hex", raw 16 byte
+    "binary" or newline delimited JSON strings ("jsonl").
+    """
+    if stream is None:
+        stream = sys.stdout.buffer
+    if generator is None:
+        generator = uuid7
+
+    while number > 0:
+        chunk_size = min(number, OUTPUT_CHUNK_SIZE)
+        stream.write(_format_chunk(generator.batch(chunk_size, "int"), output_format))
+        number -= chunk_size
+    stream.flush()
 
 
 def _benchmark():
     import timeit
 
-    uuid7()
-    a = uuid7()
     number = 2_000_000
+    for name, generator in [
+        ("UUIDv7Generator", UUIDv7Generator()),
+        ("LegacyUUIDv7Generator", LegacyUUIDv7Generator()),
+        ("uuid7", uuid7),
+    ]:
+        generator()
+        result = timeit.timeit(
+            "generator()",
+            globals=dict(generator=generator),
+            number=number,
+            timer=time.perf_counter_ns,
+        )
+        print(
+            f"{name}: generated {number:,} UUIDs at "
+            f"{result // number:,} nanoseconds per call."
+        )
+
+    batch_size = 10_000
+    batches = number // batch_size
     result = timeit.timeit(
-        "uuid7()", globals=dict(uuid7=uuid7), number=number, timer=time.perf_counter_ns
+        "uuid7.batch(batch_size)",
+        globals=dict(uuid7=uuid7, batch_size=batch_size),
+        number=batches,
+        timer=time.perf_counter_ns,
+    )
+    print(
+        f"Generated {number:,} UUIDs in batches of {batch_size:,} at "
+        f"{result // number:,} nanoseconds per UUID."
     )
 
-    print(f"Generated {number:,} UUIDs at {result // number:,} nanoseconds per call.")
+
+def _benchmark_contention():
+    from concurrent.futures import ThreadPoolExecutor
+
+    number = 400_000
+    for num_threads in (1, 4, 16):
+        generator = ThreadSafeUUIDv7Generator()
+        per_thread = number // num_threads
+
+        def work(_):
+            return [generator() for _ in range(per_thread)]
+
+        with ThreadPoolExecutor(num_threads) as executor:
+            start = time.perf_counter_ns()
+            results = list(executor.map(work, range(num_threads)))
+            result = time.perf_counter_ns() - start
+
+        total = per_thread * num_threads
+        assert len({u for r in results for u in r}) == total
+        print(
+            f"Generated {total:,} UUIDs with {num_threads} threads at "
+            f"{total * 10**9 // result:,} UUIDs per second."
+        )
+
+
+def _benchmark_output():
+    number = 1_000_000
+    with open(os.devnull, "wb") as devnull:
+        for output_format in OUTPUT_FORMATS:
+            start = time.perf_counter_ns()
+            write_uuids(number, output_format, devnull)
+            result = time.perf_counter_ns() - start
+            print(
+                f"Wrote {number:,} UUIDs as {output_format} at "
+                f"{number * 10**9 // result:,} UUIDs per second."
+            )
 
 
 def _profile():
@@ -166,6 +695,7 @@ def _main() -> None:
 
     parser = argparse.ArgumentParser(prog="uuid7", description="Generate UUIDv7s")
     parser.add_argument("-n", "--number", type=int, default=1)
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="text")
     parser.add_argument("--benchmark", action="store_true")
     parser.add_argument("--profile", action="store_true")
 
@@ -173,14 +703,15 @@ def _main() -> None:
 
     if args.benchmark:
         _benchmark()
+        _benchmark_contention()
+        _benchmark_output()
         return
 
     if args.profile:
         _profile()
         return
 
-    for i in range(args.number):
-        print(str(uuid7()))
+    write_uuids(args.number, args.format)
 
 
 if __name__ == "__main__":